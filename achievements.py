@@ -0,0 +1,52 @@
+from collections import deque
+
+# Achievement rules indexed by what triggers them. Entries from the catalogue
+# are registered by their "type":
+#   score   - {"req": n}, unlocked once a run's score reaches n
+#   event   - {"id": name}, unlocked when that game event fires
+# Score thresholds are kept sorted so a check only looks at the lowest
+# pending threshold, events are a dict lookup, and unlocked rules are
+# dropped from the indexes, so the cost of a check does not grow with the
+# size of the catalogue.
+
+
+class AchievementEngine:
+    def __init__(self, catalogue, on_unlock):
+        self.on_unlock = on_unlock
+        self.score_rules = deque()
+        self.event_rules = {}
+        for rule in catalogue:
+            if not rule["unlocked"]:
+                self.register(rule)
+
+    def register(self, rule):
+        kind = rule["type"]
+        if kind == "score":
+            self._insert(self.score_rules, rule)
+        elif kind == "event":
+            self.event_rules.setdefault(rule["id"], []).append(rule)
+        else:
+            raise ValueError(f"unknown achievement type {kind!r}")
+
+    def score(self, value):
+        rules = self.score_rules
+        while rules and rules[0]["req"] <= value:
+            self._unlock(rules.popleft())
+
+    def event(self, event_id):
+        for rule in self.event_rules.pop(event_id, ()):
+            self._unlock(rule)
+
+    def _unlock(self, rule):
+        if not rule["unlocked"]:
+            rule["unlocked"] = True
+            self.on_unlock(rule)
+
+    @staticmethod
+    def _insert(rules, rule):
+        # Keep thresholds ascending; catalogues are loaded once so a linear
+        # insert is fine here
+        i = 0
+        while i < len(rules) and rules[i]["req"] <= rule["req"]:
+            i += 1
+        rules.insert(i, rule)
@@ -0,0 +1,167 @@
+import json, os, sys
+import pygame as pg
+import engine
+from bundle import Bundle, BUNDLE_NAME, flip_name
+from collision import MaskCollider
+
+def resource_path(rel_path: str) -> str:
+    base_path = getattr(sys, "_MEIPASS", os.path.abspath("."))
+    return os.path.join(base_path, rel_path)
+
+
+def open_bundle():
+    # The packed bundle when one has been built and is usable, else None for
+    # loose files. A bad or outdated bundle only costs the faster startup.
+    path = resource_path(BUNDLE_NAME)
+    if not os.path.exists(path):
+        return None
+    try:
+        bundle = Bundle(path)
+    except (OSError, ValueError) as e:
+        print(f"warning: not using {path}: {e}", file=sys.stderr)
+        return None
+    if bundle.stale(resource_path(".")):
+        print(f"warning: not using {path}: the images or sounds changed since it was built, "
+              f"rebuild it with bundle.py", file=sys.stderr)
+        return None
+    return bundle
+
+
+BIRD_SKINS = {
+    "default": 'img/bird{}.png',
+    "red": 'img/bird_red{}.png',
+    "blue": 'img/bird_blue{}.png',
+    "asli": 'img/bird_asli{}.png',
+}
+
+# Every angle the bird can be drawn at: vel moves in 0.5 steps between
+# FLAP_VEL and MAX_VEL and is drawn rotated by vel * -2, plus the crash pose.
+BIRD_ANGLES = range(engine.MAX_VEL * -2, engine.FLAP_VEL * -2 + 1)
+DEAD_ANGLE = -90
+
+
+# Decodes every image once, converts it to the display's pixel format and
+# keeps the flipped variants (rotations live in the skin atlases) so nothing
+# is loaded or transformed while a run is being played. With a bundle,
+# images and sounds come out of it and anything it lacks is read from the
+# loose files.
+class Assets:
+    def __init__(self, bundle=None):
+        self.bundle = bundle
+        self.images = {}
+        self.variants = {}
+
+    def _prepare(self, img, alpha):
+        if pg.display.get_surface() is not None:
+            img = img.convert_alpha() if alpha else img.convert()
+        return img
+
+    def image(self, rel_path, alpha=True):
+        key = (rel_path, alpha)
+        if key not in self.images:
+            img = self.bundle.image(rel_path) if self.bundle else None
+            if img is None:
+                img = pg.image.load(resource_path(rel_path))
+            self.images[key] = self._prepare(img, alpha)
+        return self.images[key]
+
+    def flipped(self, rel_path, flip_x=False, flip_y=True):
+        key = (rel_path, "flip", flip_x, flip_y)
+        if key not in self.variants:
+            img = self.bundle.image(flip_name(rel_path, flip_x, flip_y)) if self.bundle else None
+            if img is not None:
+                self.variants[key] = self._prepare(img, True)
+            else:
+                self.variants[key] = pg.transform.flip(self.image(rel_path), flip_x, flip_y)
+        return self.variants[key]
+
+    def sound(self, rel_path):
+        sound = self.bundle.sound(rel_path) if self.bundle else None
+        return sound if sound is not None else pg.mixer.Sound(resource_path(rel_path))
+
+
+def bird_frames(assets, skin):
+    return [assets.image(BIRD_SKINS[skin].format(n)) for n in range(1, 4)]
+
+
+def rotation_atlas(frames, angles=(*BIRD_ANGLES, DEAD_ANGLE)):
+    images = {angle: [pg.transform.rotate(frame, angle) for frame in frames] for angle in angles}
+    masks = {angle: [pg.mask.from_surface(img) for img in imgs] for angle, imgs in images.items()}
+    return images, masks
+
+
+# Rotation atlases per skin, built the first time a skin is asked for.
+# preload() hands the skins not built yet to an executor so they are ready
+# by the time the bird evolves; asking for one still in flight waits for it.
+class SkinAtlas:
+    def __init__(self, assets, angles=(*BIRD_ANGLES, DEAD_ANGLE)):
+        self.assets = assets
+        self.angles = angles
+        self.built = {}
+        self.pending = {}
+        self.masks = SkinMasks(self)
+
+    def build(self, skin):
+        return rotation_atlas(bird_frames(self.assets, skin), self.angles)
+
+    def preload(self, executor):
+        for skin in BIRD_SKINS:
+            if skin not in self.built and skin not in self.pending:
+                self.pending[skin] = executor.submit(self.build, skin)
+
+    def __contains__(self, skin):
+        return skin in BIRD_SKINS
+
+    def __getitem__(self, skin):
+        if skin not in self.built:
+            future = self.pending.pop(skin, None)
+            self.built[skin] = future.result() if future else self.build(skin)
+        return self.built[skin]
+
+
+class SkinMasks:
+    # skin -> angle -> masks view of a SkinAtlas, what MaskCollider expects
+    def __init__(self, atlas):
+        self.atlas = atlas
+
+    def __getitem__(self, skin):
+        return self.atlas[skin][1]
+
+
+def build_mask_collider(assets, atlas=None):
+    # Works without a display too, so headless runs can use the same hitboxes
+    if atlas is None:
+        atlas = SkinAtlas(assets, BIRD_ANGLES)
+    return MaskCollider(atlas.masks,
+                        pg.mask.from_surface(assets.flipped('img/pipe.png')),
+                        pg.mask.from_surface(assets.image('img/pipe.png')))
+
+
+# pg.font.SysFont scans every installed font the first time it is called,
+# which takes seconds on some Linux systems. The file each name resolves to
+# is kept in a small JSON cache so later launches open it directly; a name
+# with no match is cached as None and gets pygame's default font, as SysFont
+# would give it.
+class FontCache:
+    def __init__(self, path):
+        self.path = path
+        try:
+            with open(path) as f:
+                self.paths = json.load(f)
+        except (OSError, ValueError):
+            self.paths = {}
+        self.fonts = {}
+        self.dirty = False
+
+    def resolve(self, name):
+        path = self.paths.get(name, "")
+        if path == "" or (path is not None and not os.path.exists(path)):
+            path = self.paths[name] = pg.font.match_font(name)
+            self.dirty = True
+        return path
+
+    def font(self, name, size):
+        key = (name, size)
+        if key not in self.fonts:
+            self.fonts[key] = pg.font.Font(self.resolve(name), size)
+        return self.fonts[key]
@@ -0,0 +1,311 @@
+import argparse, sys, threading, time
+import engine
+from engine import GRAVITY, MAX_VEL, FLAP_VEL, BIRD_X, BIRD_H, PIPE_W, GROUND_Y
+from collision import REACH_H, REACH_W, MARGIN
+
+# Autopilot for attract mode and soak testing. The planner searches flap /
+# no-flap sequences over the engine's own physics against a snapshot of the
+# bird and pipe_queue. Every pipe that can reach the bird within the
+# horizon is already in the queue, or for a course game known from the
+# course with any speed changes, so the search needs no guessing. It is a
+# depth-first search that tries not flapping first, prunes any state that
+# hits something and memoizes states by (y, vel, pipe offset), so it
+# usually returns after following one path to the horizon.
+#
+# Autopilot runs the planner on a worker thread against the latest snapshot,
+# each search cut off after budget_ms. flap() follows the newest plan for as
+# long as the bird is where that plan expected it, so a search that ran
+# out of time just means the previous plan is used for longer.
+
+# Ticks searched ahead, enough to see two pipes past the next on a course.
+# Random pipes are only known once spawned, which caps it lower there.
+HORIZON = 240
+# How far above a gap's bottom edge (less the margin) the search aims first
+AIM = 20
+
+
+class Snapshot:
+    __slots__ = ("tick", "y", "vel", "pipes", "scroll_spd", "spawns", "generation")
+
+    def __init__(self, game, generation=0, horizon=HORIZON):
+        self.tick = game.tick
+        self.y = game.bird.y
+        self.vel = game.bird.vel
+        self.pipes = tuple((pipe.x, pipe.gap_top, pipe.gap_bottom) for pipe in game.pipe_queue)
+        self.scroll_spd = game.scroll_spd
+        # (tick, scroll speed, gap top, gap bottom) of the pipes a course
+        # will spawn within the horizon; None when they are random
+        self.spawns = None
+        if game.course is not None:
+            spawns = []
+            tick = game.last_pipe
+            index = game.spawned
+            while True:
+                entry = game.course[index]
+                # Overdue entries (only the first, at the start) spawn next tick
+                tick = max(tick + entry.ticks, game.tick + 1)
+                if tick > game.tick + horizon:
+                    break
+                pair = engine.PipePair(engine.WIDTH, entry.y, entry.gap)
+                spawns.append((tick, entry.scroll_spd, pair.gap_top, pair.gap_bottom))
+                index += 1
+            self.spawns = tuple(spawns)
+        self.generation = generation
+
+
+class Plan:
+    # actions[i] is the flap decision for tick tick + 1 + i, states[i] the
+    # (y, vel) the bird should have after that tick
+    __slots__ = ("tick", "actions", "states", "generation")
+
+    def __init__(self, tick, actions, states, generation):
+        self.tick = tick
+        self.actions = actions
+        self.states = states
+        self.generation = generation
+
+    def action(self, game):
+        i = game.tick - self.tick
+        if not 0 <= i < len(self.actions):
+            return None
+        if i:
+            y, vel = self.states[i - 1]
+            if abs(game.bird.y - y) > 1e-6 or game.bird.vel != vel:
+                return None
+        return self.actions[i]
+
+
+class OutOfTime(Exception):
+    pass
+
+
+class Planner:
+    # Dead ends are remembered across searches of one run. A pipe spawns
+    # far enough right that it cannot reach the bird within the horizon,
+    # and passed pipes no longer matter, so whether a state keyed by
+    # (y, vel, tick) can survive never changes during a run. y moves in
+    # half pixels and is keyed doubled, so the key is exact. The tick
+    # stands for the pipe offset, as every pipe moves a fixed distance per
+    # tick. A search cut off by its deadline still leaves its finished
+    # dead ends for the next one.
+    def __init__(self, horizon=HORIZON, margin=MARGIN, max_memo=200_000):
+        self.horizon = horizon
+        self.margin = margin
+        self.max_memo = max_memo
+        self.dead = {}
+        self.generation = None
+        self.nodes = 0
+
+    def bounds(self, snapshot, horizon):
+        # Allowed (top, bottom) range for the bird after each tick, the
+        # bottom edge to aim for (that of the next pipe gap it must pass)
+        # and the next tick at which a pipe constrains it
+        pipes = list(snapshot.pipes)
+        spawns = list(snapshot.spawns or ())
+        # How far everything has scrolled after each tick. A pipe yet to
+        # spawn is placed where it would have been had it always existed.
+        speed = snapshot.scroll_spd
+        moved = [0]
+        for t in range(1, horizon + 1):
+            moved.append(moved[-1] + speed)
+            if spawns and spawns[0][0] == snapshot.tick + t:
+                _, speed, gap_top, gap_bottom = spawns.pop(0)
+                pipes.append((engine.WIDTH + moved[t], gap_top, gap_bottom))
+        lows, highs = [None], [None]
+        for t in range(1, horizon + 1):
+            low, high = 0, GROUND_Y - 1e-6
+            for x, gap_top, gap_bottom in pipes:
+                x -= moved[t]
+                if x >= BIRD_X + REACH_W:
+                    break
+                if x + PIPE_W > BIRD_X:
+                    low = max(low, gap_top + self.margin)
+                    high = min(high, gap_bottom - self.margin)
+            lows.append(low)
+            highs.append(high)
+        aims = [GROUND_Y // 2] * (horizon + 2)
+        nexts = [None] * (horizon + 2)
+        for t in range(horizon, 0, -1):
+            piped = highs[t] < GROUND_Y - 1
+            aims[t] = highs[t] - AIM if piped else aims[t + 1]
+            nexts[t] = t if piped else nexts[t + 1]
+        return lows, highs, aims, nexts
+
+    def plan(self, snapshot, deadline=None):
+        if snapshot.generation != self.generation or len(self.dead) > self.max_memo:
+            self.dead = {}
+            self.generation = snapshot.generation
+        # Without a course only pipes already spawned are known
+        horizon = self.horizon
+        if snapshot.spawns is None:
+            horizon = min(horizon, (engine.WIDTH - BIRD_X - REACH_W) // snapshot.scroll_spd)
+        lows, highs, aims, nexts = self.bounds(snapshot, horizon)
+        base = snapshot.tick
+        dead = self.dead
+        memo = {}
+        self.nodes = 0
+
+        def survive(t, y, vel):
+            # Ticks survived from tick t on when choosing well
+            if t > horizon:
+                return 0
+            key = (round(2 * y), vel, base + t)
+            if key in memo:
+                return memo[key][0]
+            if key in dead:
+                return dead[key]
+            self.nodes += 1
+            if deadline is not None and self.nodes % 256 == 0 and time.perf_counter() > deadline:
+                raise OutOfTime
+            vel = min(vel + GRAVITY, MAX_VEL)
+            if y + BIRD_H < GROUND_Y:
+                y += vel
+            best, choice = 0, False
+            # Prune early when the next gap is out of reach even at full
+            # climb (under 10 px a tick) or full fall (at most MAX_VEL)
+            ahead = nexts[t + 1] if t < horizon else None
+            if ahead is not None:
+                ticks = ahead - t
+                reachable = y - 10 * ticks <= highs[ahead] - BIRD_H and y + MAX_VEL * ticks >= lows[ahead]
+            else:
+                reachable = True
+            if reachable and lows[t] <= y:
+                # Try first what the simple aim would do, so the first path
+                # tried usually reaches the horizon. The bird's angle, and
+                # so its reach, follows the velocity after the choice.
+                first = y + BIRD_H + vel > aims[t]
+                for flap in (first, not first):
+                    after = FLAP_VEL if flap else vel
+                    if y + REACH_H[after] > highs[t]:
+                        continue
+                    ticks = 1 + survive(t + 1, y, after)
+                    if ticks > best:
+                        best, choice = ticks, flap
+                    if best == horizon - t + 1:
+                        break
+            memo[key] = (best, choice)
+            if best < horizon - t + 1:
+                dead[key] = best
+            return best
+
+        try:
+            survive(1, snapshot.y, snapshot.vel)
+        except OutOfTime:
+            return None
+
+        # Walk the memo along the chosen path
+        actions, states = [], []
+        y, vel = snapshot.y, snapshot.vel
+        for t in range(1, horizon + 1):
+            entry = memo.get((round(2 * y), vel, base + t))
+            if entry is None or entry[0] == 0:
+                break
+            vel = min(vel + GRAVITY, MAX_VEL)
+            if y + BIRD_H < GROUND_Y:
+                y += vel
+            if entry[1]:
+                vel = FLAP_VEL
+            actions.append(entry[1])
+            states.append((y, vel))
+        return Plan(snapshot.tick, actions, states, snapshot.generation)
+
+
+def fallback(game):
+    # Aim for just above the next gap's bottom edge
+    target = game.pipe_queue[0].gap_bottom - 30 if game.pipe_queue else GROUND_Y // 2
+    return game.bird.y + BIRD_H + game.bird.vel > target
+
+
+class Autopilot:
+    # Input source: flap(game) is asked before every tick whether to flap.
+    # threaded=False plans inline instead; with an unlimited budget no
+    # search is cut off by the clock, which keeps headless runs reproducible.
+    def __init__(self, planner=None, budget_ms=4.0, threaded=True):
+        self.planner = planner or Planner()
+        self.budget = budget_ms / 1000
+        self.threaded = threaded
+        self.plan = None
+        self.generation = 0
+        self.searches = self.timeouts = self.fallbacks = 0
+        self.lock = threading.Lock()
+        self.latest = None
+        self.wake = threading.Event()
+        self.closed = False
+        if threaded:
+            self.thread = threading.Thread(target=self._run, name="autopilot", daemon=True)
+            self.thread.start()
+
+    def reset(self):
+        # Call when the game is reset; plans for the previous run are dropped
+        with self.lock:
+            self.generation += 1
+            self.plan = None
+            self.latest = None
+
+    def flap(self, game):
+        snapshot = Snapshot(game, self.generation, self.planner.horizon)
+        if self.threaded:
+            with self.lock:
+                self.latest = snapshot
+            self.wake.set()
+        else:
+            self._search(snapshot)
+        plan = self.plan
+        action = plan.action(game) if plan is not None and plan.generation == self.generation else None
+        if action is None:
+            self.fallbacks += 1
+            return fallback(game)
+        return action
+
+    def _search(self, snapshot):
+        plan = self.planner.plan(snapshot, time.perf_counter() + self.budget)
+        self.searches += 1
+        if plan is None:
+            self.timeouts += 1
+            return
+        with self.lock:
+            if plan.generation == self.generation:
+                self.plan = plan
+
+    def _run(self):
+        while not self.closed:
+            self.wake.wait()
+            self.wake.clear()
+            with self.lock:
+                snapshot, self.latest = self.latest, None
+            if snapshot is not None:
+                self._search(snapshot)
+
+    def close(self):
+        self.closed = True
+        self.wake.set()
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Soak test: let the autopilot play headless runs.")
+    parser.add_argument("--runs", type=int, default=10)
+    parser.add_argument("--seed", type=int, default=0, help="seed of the first run, the rest count up")
+    parser.add_argument("--max-ticks", type=int, default=100_000)
+    parser.add_argument("--budget-ms", type=float, default=float("inf"),
+                        help="time allowed per search, unlimited by default so runs are reproducible")
+    parser.add_argument("--boxes", action="store_true", help="use box collisions instead of the game's pixel masks")
+    args = parser.parse_args(argv)
+
+    collider = None
+    if not args.boxes:
+        from assets import Assets, build_mask_collider, open_bundle
+        collider = build_mask_collider(Assets(open_bundle()))
+
+    for seed in range(args.seed, args.seed + args.runs):
+        pilot = Autopilot(budget_ms=args.budget_ms, threaded=False)
+        start = time.perf_counter()
+        game = engine.run_episode(pilot.flap, seed, args.max_ticks, collider=collider)
+        elapsed = time.perf_counter() - start
+        print(f"seed {seed}: score={game.score} ticks={game.tick} cause={game.death_cause} "
+              f"searches={pilot.searches} timeouts={pilot.timeouts} fallbacks={pilot.fallbacks} "
+              f"({elapsed / max(game.tick, 1) * 1e6:.0f} us/tick)")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
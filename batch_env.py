@@ -0,0 +1,132 @@
+import random
+import numpy as np
+import engine
+from engine import (WIDTH, HEIGHT, GROUND_Y, GRAVITY, MAX_VEL, FLAP_VEL, BIRD_X, BIRD_W, BIRD_H,
+                    PIPE_W, PIPE_H, SCROLL_SPD, GAP, FREQUENCY, PIPE_HEIGHT_RANGE)
+
+# N birds stepped in lockstep through one shared pipe course. Same rules as
+# engine.Game, with the per-bird state held in NumPy arrays so a whole
+# population is advanced with a handful of array operations per tick.
+# Pipe heights come from random.Random(seed) exactly like engine.Game, so a
+# bird here follows the same trajectory as a Game with the same seed.
+
+ALIVE, CEILING, PIPE, GROUND = 0, 1, 2, 3
+CAUSES = {CEILING: "ceiling", PIPE: "pipe", GROUND: "ground"}
+OBS_SIZE = 5
+
+
+class BatchEnv:
+    def __init__(self, n, seed=None, scroll_spd=SCROLL_SPD, gap=GAP, frequency=FREQUENCY,
+                 pipe_height_range=PIPE_HEIGHT_RANGE):
+        self.n = n
+        self.scroll_spd = scroll_spd
+        self.gap = gap
+        self.frequency = engine.ms_to_ticks(frequency)
+        self.pipe_height_range = pipe_height_range
+        # Enough slots for every pipe pair that can be on screen at once
+        self.max_pipes = (WIDTH + PIPE_W) // (scroll_spd * self.frequency) + 2
+        self.reset(seed)
+
+    def reset(self, seed=None):
+        self.seed = seed
+        self.rng = random.Random(seed)
+        n = self.n
+        self.y = np.full(n, HEIGHT // 2, dtype=np.float64)
+        self.vel = np.zeros(n, dtype=np.float64)
+        self.alive = np.ones(n, dtype=bool)
+        self.score = np.zeros(n, dtype=np.int32)
+        self.flaps = np.zeros(n, dtype=np.int32)
+        self.ticks = np.zeros(n, dtype=np.int32)
+        self.cause = np.zeros(n, dtype=np.int8)
+
+        self.pipe_x = np.zeros(self.max_pipes, dtype=np.float64)
+        self.pipe_gap_top = np.zeros(self.max_pipes, dtype=np.float64)
+        self.pipe_gap_bottom = np.zeros(self.max_pipes, dtype=np.float64)
+        self.pipe_count = 0
+        self.next_pipe = 0
+        self.tick = 0
+        self.last_pipe = -self.frequency
+        return self.observe()
+
+    @property
+    def done(self):
+        return not self.alive.any()
+
+    def step(self, actions):
+        flap = np.asarray(actions, dtype=bool) & self.alive
+        was_alive = self.alive.copy()
+        self.tick += 1
+
+        vel = np.minimum(self.vel + GRAVITY, MAX_VEL)
+        moving = was_alive & (self.y + BIRD_H < GROUND_Y)
+        self.y += np.where(moving, vel, 0)
+        vel[flap] = FLAP_VEL
+        self.vel = np.where(was_alive, vel, self.vel)
+        self.flaps += flap
+
+        self._scroll_pipes()
+
+        reward = np.zeros(self.n, dtype=np.float32)
+        if self.next_pipe < self.pipe_count and BIRD_X > self.pipe_x[self.next_pipe] + PIPE_W:
+            self.next_pipe += 1
+            self.score += was_alive
+            reward[was_alive] = 1.0
+
+        ceiling = was_alive & (self.y < 0)
+        pipe = was_alive & ~ceiling & self._pipe_hits()
+        ground = was_alive & ~ceiling & ~pipe & (self.y + BIRD_H >= GROUND_Y)
+        self.cause[ceiling] = CEILING
+        self.cause[pipe] = PIPE
+        self.cause[ground] = GROUND
+        self.alive = was_alive & ~(ceiling | pipe | ground)
+        self.ticks += was_alive
+
+        return self.observe(), reward, ~self.alive, {"score": self.score, "cause": self.cause}
+
+    def observe(self):
+        obs = np.empty((self.n, OBS_SIZE), dtype=np.float32)
+        obs[:, 0] = self.y
+        obs[:, 1] = self.vel
+        if self.next_pipe < self.pipe_count:
+            i = self.next_pipe
+            obs[:, 2] = self.pipe_x[i] - BIRD_X
+            obs[:, 3] = self.pipe_gap_top[i]
+            obs[:, 4] = self.pipe_gap_bottom[i]
+        else:
+            obs[:, 2] = WIDTH - BIRD_X
+            obs[:, 3] = HEIGHT // 2 - self.gap // 2
+            obs[:, 4] = HEIGHT // 2 + self.gap // 2
+        return obs
+
+    def _scroll_pipes(self):
+        count = self.pipe_count
+        self.pipe_x[:count] -= self.scroll_spd
+        gone = int(np.count_nonzero(self.pipe_x[:count] + PIPE_W < 0))
+        if gone:
+            for arr in (self.pipe_x, self.pipe_gap_top, self.pipe_gap_bottom):
+                arr[:count - gone] = arr[gone:count]
+            self.pipe_count = count = count - gone
+            self.next_pipe = max(self.next_pipe - gone, 0)
+
+        if self.tick - self.last_pipe >= self.frequency:
+            centre = HEIGHT // 2 + self.rng.randint(*self.pipe_height_range)
+            self.pipe_x[count] = WIDTH
+            self.pipe_gap_top[count] = centre - self.gap // 2
+            self.pipe_gap_bottom[count] = centre + self.gap // 2
+            self.pipe_count += 1
+            self.last_pipe = self.tick
+
+    def _pipe_hits(self):
+        # Every bird shares the same x, so the broad phase is a scalar test per
+        # pipe and only the pipes overlapping BIRD_X..BIRD_X+BIRD_W remain.
+        px = self.pipe_x[:self.pipe_count]
+        near = (BIRD_X < px + PIPE_W) & (px < BIRD_X + BIRD_W)
+        if not near.any():
+            return np.zeros(self.n, dtype=bool)
+        top = self.y[:, None]
+        bottom = top + BIRD_H
+        gap_top = self.pipe_gap_top[:self.pipe_count][near]
+        gap_bottom = self.pipe_gap_bottom[:self.pipe_count][near]
+        hit_top = (top < gap_top) & (gap_top - PIPE_H < bottom)
+        hit_bottom = (gap_bottom < bottom) & (top < gap_bottom + PIPE_H)
+        return (hit_top | hit_bottom).any(axis=1)
@@ -0,0 +1,209 @@
+import argparse, json, os, pathlib, subprocess, sys, tempfile, time, tracemalloc
+from autopilot import fallback
+
+# Headless benchmarks of the game's own systems. Runs main.py's sprites,
+# simulation, particles, menus and renderer under SDL's dummy video/audio
+# drivers with scripted scenarios, uncapped. Reports frames per second,
+# per-frame transient allocations (tracemalloc peak) and cold startup time,
+# and fails when a result regresses past the stored baseline.
+
+os.environ.setdefault("SDL_VIDEODRIVER", "dummy")
+os.environ.setdefault("SDL_AUDIODRIVER", "dummy")
+# Keep benchmark runs out of the player's save directory, removed at exit
+APPDATA = tempfile.TemporaryDirectory(prefix="flappy-bench-")
+os.environ["APPDATA"] = APPDATA.name
+
+BASELINE_PATH = pathlib.Path(__file__).with_name("bench_baseline.json")
+
+
+def start_run(main):
+    main.reset_game(seed=main.world.seed + 1 if main.world.seed is not None else 0)
+    main.game_state = "playing"
+
+
+def play_frame(main, flap):
+    main.fixed_update(flap)
+    main.bird_group.update()
+    main.pipe_group.update()
+    main.draw_scene()
+
+
+def scenario_survival(main):
+    start_run(main)
+
+    def frame(i):
+        if main.game_state != "playing":
+            start_run(main)
+        play_frame(main, fallback(main.world))
+        main.draw_text(str(main.score), main.font, main.WHITE, main.WIDTH // 2, 50)
+    return frame
+
+
+def scenario_explosions(main):
+    start_run(main)
+    main.game_state = "game_over"
+
+    def frame(i):
+        if i % 5 == 0:
+            main.create_explosion(main.WIDTH // 2, main.HEIGHT // 3, main.flappy.image)
+        play_frame(main, False)
+    return frame
+
+
+def scenario_powerups(main):
+    start_run(main)
+
+    def frame(i):
+        if main.game_state != "playing":
+            start_run(main)
+        if i % 2 == 0:
+            main.create_powerup_effect(main.flappy.rect.centerx, main.flappy.rect.centery)
+        play_frame(main, fallback(main.world))
+    return frame
+
+
+def scenario_achievements_menu(main):
+    main.game_state = "achievements_menu"
+    unlocked = [ach["unlocked"] for ach in main.achievements]
+
+    def frame(i):
+        # Flip one entry now and then so the cached screen gets rebuilt
+        if i % 60 == 0:
+            ach = main.achievements[(i // 60) % len(main.achievements)]
+            ach["unlocked"] = not ach["unlocked"]
+        main.draw_scene()
+        main.renderer.blit(main.renderer.overlay(150), (0, 0))
+        main.renderer.blits(main.achievements_screen(tuple(ach["unlocked"] for ach in main.achievements)))
+        main.back_button.draw()
+    frame.cleanup = lambda: [ach.update(unlocked=u) for ach, u in zip(main.achievements, unlocked)]
+    return frame
+
+
+def scenario_restarts(main):
+    def frame(i):
+        start_run(main)
+        for _ in range(3):
+            play_frame(main, i % 2 == 0)
+    return frame
+
+
+SCENARIOS = {
+    "survival": scenario_survival,
+    "explosions": scenario_explosions,
+    "powerups": scenario_powerups,
+    "achievements_menu": scenario_achievements_menu,
+    "restarts": scenario_restarts,
+}
+
+
+def reset(main):
+    # Every scenario starts from the same state, whichever ran before it:
+    # no particles, pipes or menu left over, and the screen repainted whole
+    main.reset_game(seed=0)
+    main.game_state = "start_menu"
+    main.renderer.full_redraw = True
+    main.draw_scene()
+    main.renderer.present()
+
+
+def run_scenario(main, name, frames):
+    # First pass for speed, second under tracemalloc for allocations
+    reset(main)
+    frame = SCENARIOS[name](main)
+    start = time.perf_counter()
+    for i in range(frames):
+        frame(i)
+        main.renderer.present()
+    elapsed = time.perf_counter() - start
+
+    alloc_frames = max(frames // 4, 1)
+    tracemalloc.start()
+    peaks = []
+    for i in range(alloc_frames):
+        base = tracemalloc.get_traced_memory()[0]
+        tracemalloc.reset_peak()
+        frame(frames + i)
+        main.renderer.present()
+        peaks.append(tracemalloc.get_traced_memory()[1] - base)
+    tracemalloc.stop()
+    getattr(frame, "cleanup", lambda: None)()
+
+    peaks.sort()
+    return {
+        "fps": round(frames / elapsed, 1),
+        "frame_ms": round(elapsed / frames * 1000, 3),
+        "alloc_kb": round(sum(peaks) / len(peaks) / 1024, 2),
+        "alloc_p95_kb": round(peaks[int(0.95 * (len(peaks) - 1))] / 1024, 2),
+    }
+
+
+def measure_startup(repeats=3):
+    # Cold import and setup of main.py in a fresh interpreter, best of a few runs
+    code = "import time; t = time.perf_counter(); import main; main.setup([]); print(time.perf_counter() - t)"
+    times = []
+    for _ in range(repeats):
+        out = subprocess.run([sys.executable, "-c", code], cwd=pathlib.Path(__file__).parent,
+                             capture_output=True, text=True, env=os.environ, check=True)
+        times.append(float(out.stdout.strip().splitlines()[-1]))
+    return round(min(times), 3)
+
+
+def compare(results, baseline, tolerance):
+    failures = []
+    for name, result in results["scenarios"].items():
+        base = baseline.get("scenarios", {}).get(name)
+        if not base:
+            continue
+        if result["fps"] < base["fps"] * (1 - tolerance):
+            failures.append(f"{name}: {result['fps']} fps vs baseline {base['fps']}")
+        if result["alloc_kb"] > base["alloc_kb"] * (1 + tolerance) + 1:
+            failures.append(f"{name}: {result['alloc_kb']} KiB/frame vs baseline {base['alloc_kb']}")
+    if "startup_s" in results and "startup_s" in baseline:
+        if results["startup_s"] > baseline["startup_s"] * (1 + tolerance):
+            failures.append(f"startup: {results['startup_s']} s vs baseline {baseline['startup_s']}")
+    return failures
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Run headless game benchmarks and check them against a baseline.")
+    parser.add_argument("--scenario", action="append", choices=sorted(SCENARIOS), help="run only this scenario (repeatable)")
+    parser.add_argument("--frames", type=int, default=1200)
+    parser.add_argument("--baseline", type=pathlib.Path, default=BASELINE_PATH)
+    parser.add_argument("--tolerance", type=float, default=0.25, help="allowed regression as a fraction of the baseline")
+    parser.add_argument("--update-baseline", action="store_true", help="store these results as the new baseline")
+    parser.add_argument("--no-startup", action="store_true", help="skip the startup time measurement")
+    parser.add_argument("--output", type=pathlib.Path, help="also write the results as JSON here")
+    parser.add_argument("--full-redraw", action="store_true", help="repaint the whole screen every frame, like the game's --full-redraw")
+    args = parser.parse_args(argv)
+
+    results = {"scenarios": {}}
+    if not args.no_startup:
+        results["startup_s"] = measure_startup()
+        print(f"{'startup':<20}{results['startup_s']:.3f} s")
+
+    import main as game
+    game.setup(["--full-redraw"] if args.full_redraw else [])
+    for name in args.scenario or SCENARIOS:
+        result = run_scenario(game, name, args.frames)
+        results["scenarios"][name] = result
+        print(f"{name:<20}{result['fps']:>9.1f} fps {result['frame_ms']:>8.3f} ms/frame "
+              f"{result['alloc_kb']:>9.2f} KiB/frame (p95 {result['alloc_p95_kb']:.2f})")
+    game.store.close()
+
+    if args.output:
+        args.output.write_text(json.dumps(results, indent=4))
+    if args.update_baseline:
+        args.baseline.write_text(json.dumps(results, indent=4) + "\n")
+        print(f"baseline written to {args.baseline}")
+        return 0
+    if not args.baseline.exists():
+        print("no baseline stored, run with --update-baseline to create one")
+        return 0
+    failures = compare(results, json.loads(args.baseline.read_text()), args.tolerance)
+    for failure in failures:
+        print(f"REGRESSION {failure}")
+    return 1 if failures else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,168 @@
+import argparse, glob, json, mmap, os, struct, sys
+import pygame as pg
+
+# All game assets packed into one file that is memory-mapped at runtime, so
+# a launch does no PNG or MP3 decoding and a frozen build ships one file.
+# Layout (little endian):
+#   header    "FBAB", version u8, 3 pad bytes, manifest length u32
+#   manifest  UTF-8 JSON, padded to a multiple of 64 bytes
+#   data      the image atlas as raw RGBA rows, then each sound's PCM
+# The manifest gives the atlas size and offset, each image's rect in it,
+# each sound's offset and length, and the mixer format the PCM was
+# decoded to (frequency, size, channels), and the size and mtime of every
+# source file it was built from. Offsets are relative to data.
+# Images are keyed by their path under the source tree, prebuilt flips by
+# flip_name(). Build it with `python bundle.py`; the game uses it when it
+# is present and up to date, and falls back to the loose files otherwise.
+
+MAGIC = b"FBAB"
+VERSION = 2
+HEADER = struct.Struct("<4sBxxxI")
+BUNDLE_NAME = "assets.bundle"
+ATLAS_WIDTH = 2048
+# Images that are also drawn flipped, as (path, flip_x, flip_y)
+FLIPS = [('img/pipe.png', False, True)]
+SOURCES = ("img/*.png", "sound/*.mp3")
+
+
+def flip_name(rel_path, flip_x, flip_y):
+    return f"{rel_path}:flip{'x' if flip_x else ''}{'y' if flip_y else ''}"
+
+
+class BundleError(ValueError):
+    pass
+
+
+def source_stamps(root):
+    # [size, mtime in ns] of every source file, keyed like the manifest
+    stamps = {}
+    for pattern in SOURCES:
+        for path in sorted(glob.glob(os.path.join(root, pattern))):
+            stat = os.stat(path)
+            stamps[os.path.relpath(path, root).replace(os.sep, "/")] = [stat.st_size, stat.st_mtime_ns]
+    return stamps
+
+
+def pack_shelves(sizes, width):
+    # Tallest first, left to right in rows; returns positions and total height
+    order = sorted(range(len(sizes)), key=lambda i: -sizes[i][1])
+    positions = [None] * len(sizes)
+    x = y = shelf_h = 0
+    for i in order:
+        w, h = sizes[i]
+        if x + w > width:
+            x, y, shelf_h = 0, y + shelf_h, 0
+        positions[i] = (x, y)
+        x += w
+        shelf_h = max(shelf_h, h)
+    return positions, y + shelf_h
+
+
+def align(n, to):
+    return -n % to
+
+
+def build(out_path, root="."):
+    # Sounds are decoded by the mixer itself, so they come out in exactly the
+    # format Sound(buffer=...) expects for the same mixer settings
+    pg.mixer.init()
+    images = {}
+    for path in sorted(glob.glob(os.path.join(root, "img", "*.png"))):
+        images[os.path.relpath(path, root).replace(os.sep, "/")] = pg.image.load(path)
+    for rel_path, flip_x, flip_y in FLIPS:
+        images[flip_name(rel_path, flip_x, flip_y)] = pg.transform.flip(images[rel_path], flip_x, flip_y)
+
+    names = list(images)
+    sizes = [images[name].get_size() for name in names]
+    positions, height = pack_shelves(sizes, ATLAS_WIDTH)
+    atlas = pg.Surface((ATLAS_WIDTH, height), pg.SRCALPHA, 32)
+    for name, pos in zip(names, positions):
+        atlas.blit(images[name], pos)
+    data = bytearray(pg.image.tobytes(atlas, "RGBA"))
+
+    sounds = {}
+    for path in sorted(glob.glob(os.path.join(root, "sound", "*.mp3"))):
+        data += bytes(align(len(data), 16))
+        pcm = pg.mixer.Sound(path).get_raw()
+        sounds[os.path.relpath(path, root).replace(os.sep, "/")] = [len(data), len(pcm)]
+        data += pcm
+
+    manifest = json.dumps({
+        "atlas": [ATLAS_WIDTH, height, 0],
+        "images": {name: [*pos, *size] for name, pos, size in zip(names, positions, sizes)},
+        "mixer": list(pg.mixer.get_init()),
+        "sounds": sounds,
+        "sources": source_stamps(root),
+    }).encode()
+    manifest += b" " * align(HEADER.size + len(manifest), 64)
+    with open(out_path, "wb") as f:
+        f.write(HEADER.pack(MAGIC, VERSION, len(manifest)))
+        f.write(manifest)
+        f.write(data)
+    return len(images), len(sounds), HEADER.size + len(manifest) + len(data)
+
+
+class Bundle:
+    # Surfaces returned by image() are subsurfaces of one atlas surface that
+    # reads straight from the mapping, so the bundle stays open for as long
+    # as any of them is in use
+    def __init__(self, path):
+        with open(path, "rb") as f:
+            # Copy on write, so a surface drawn onto can never touch the file
+            self.map = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_COPY)
+        if len(self.map) < HEADER.size:
+            raise BundleError("bundle is truncated")
+        magic, version, manifest_len = HEADER.unpack_from(self.map)
+        if magic != MAGIC:
+            raise BundleError("not an asset bundle")
+        if version != VERSION:
+            raise BundleError(f"unsupported bundle version {version}")
+        self.data = HEADER.size + manifest_len
+        try:
+            manifest = json.loads(self.map[HEADER.size:self.data])
+            self.images = manifest["images"]
+            self.sounds = manifest["sounds"]
+            self.mixer = tuple(manifest["mixer"])
+            self.sources = manifest["sources"]
+            width, height, offset = manifest["atlas"]
+        except (ValueError, KeyError, TypeError):
+            raise BundleError("bundle manifest is corrupt") from None
+        if self.data + offset + width * height * 4 > len(self.map):
+            raise BundleError("bundle is truncated")
+        start = self.data + offset
+        self.atlas = pg.image.frombuffer(memoryview(self.map)[start:start + width * height * 4],
+                                         (width, height), "RGBA")
+
+    def stale(self, root):
+        # Whether the source files under root changed since the build. A
+        # build that ships only the bundle has nothing to compare against.
+        stamps = source_stamps(root)
+        return bool(stamps) and stamps != self.sources
+
+    def image(self, name):
+        rect = self.images.get(name)
+        return self.atlas.subsurface(rect) if rect else None
+
+    def sound(self, name):
+        # Only usable if the mixer runs in the format the PCM was decoded to
+        entry = self.sounds.get(name)
+        if entry is None or pg.mixer.get_init() != self.mixer:
+            return None
+        offset, length = entry
+        start = self.data + offset
+        return pg.mixer.Sound(buffer=self.map[start:start + length])
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Pack the game's images and sounds into one asset bundle.")
+    parser.add_argument("--out", default=BUNDLE_NAME)
+    parser.add_argument("--root", default=".", help="directory holding img/ and sound/")
+    args = parser.parse_args(argv)
+    os.environ.setdefault("SDL_AUDIODRIVER", "dummy")
+    images, sounds, size = build(args.out, args.root)
+    print(f"{args.out}: {images} images, {sounds} sounds, {size / 1024:.0f} KiB")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
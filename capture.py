@@ -0,0 +1,115 @@
+import multiprocessing, os, queue
+from multiprocessing import shared_memory
+import numpy as np
+
+# Frame capture to a background encoder process. Frames travel through a
+# ring of shared-memory slots: grab() copies the screen's pixel buffer into
+# a free slot with one memcpy and queues its index, and the encoder converts
+# and writes it, then hands the slot back. With every slot in use, a live
+# grab() drops the frame rather than wait, so recording never stalls the
+# game loop; offline rendering waits instead and keeps every frame.
+#
+# The encoder is a spawned process, so it never shares the game's display.
+# Spawning imports the game's __main__ again, which is why main.py does
+# nothing on import and calls multiprocessing.freeze_support() first for
+# frozen builds.
+#
+# The output format follows the path: a "%d"-style pattern writes a PNG
+# sequence, .y4m writes YUV4MPEG2 (4:2:0, BT.601 limited range) and
+# anything else raw RGB24 frames back to back.
+
+
+def rgb_frame(buf, layout):
+    # (height, width, 3) RGB view of a slot holding a surface's raw pixels
+    width, height, pitch, bpp, shifts = layout
+    pixels = np.ndarray((height, pitch), np.uint8, buf)[:, :width * bpp].reshape(height, width, bpp)
+    return pixels[:, :, [shift // 8 for shift in shifts]]
+
+
+def rgb_to_yuv420(rgb):
+    # 8-bit fixed point BT.601 coefficients. Chroma is linear in RGB, so it
+    # is taken from each 2x2 block's RGB sum rather than averaged afterwards
+    rgb = rgb.astype(np.uint16)
+    r, g, b = rgb[:, :, 0], rgb[:, :, 1], rgb[:, :, 2]
+    y = (66 * r + 129 * g + 25 * b + 4224) >> 8
+    block = (rgb[0::2, 0::2] + rgb[1::2, 0::2] + rgb[0::2, 1::2] + rgb[1::2, 1::2]).astype(np.int32)
+    r, g, b = block[:, :, 0], block[:, :, 1], block[:, :, 2]
+    u = (-38 * r - 74 * g + 112 * b + 131584) >> 10
+    v = (112 * r - 94 * g - 18 * b + 131584) >> 10
+    return [plane.astype(np.uint8) for plane in (y, u, v)]
+
+
+def encode(path, fps, layout, shm_name, slot_size, ready, free):
+    # Runs in the encoder process
+    shm = shared_memory.SharedMemory(name=shm_name)
+    width, height = layout[0], layout[1]
+    out = None
+    if "%" not in path:
+        out = open(path, "wb")
+        if path.endswith(".y4m"):
+            out.write(f"YUV4MPEG2 W{width} H{height} F{fps}:1 Ip A1:1 C420jpeg\n".encode())
+    try:
+        while True:
+            item = ready.get()
+            if item is None:
+                break
+            slot, number = item
+            rgb = rgb_frame(shm.buf[slot * slot_size:(slot + 1) * slot_size], layout)
+            if out is None:
+                import pygame as pg
+                pg.image.save(pg.image.frombuffer(np.ascontiguousarray(rgb).tobytes(), (width, height), "RGB"),
+                              path % number)
+            elif path.endswith(".y4m"):
+                out.write(b"FRAME\n")
+                for plane in rgb_to_yuv420(rgb):
+                    out.write(plane.tobytes())
+            else:
+                out.write(np.ascontiguousarray(rgb).tobytes())
+            del rgb
+            free.put(slot)
+    finally:
+        if out is not None:
+            out.close()
+        shm.close()
+
+
+class FrameCapture:
+    def __init__(self, path, surface, fps, slots=8):
+        width, height = surface.get_size()
+        if path.endswith(".y4m") and (width % 2 or height % 2):
+            raise ValueError("y4m capture needs an even frame size")
+        self.layout = (width, height, surface.get_pitch(), surface.get_bytesize(), surface.get_shifts()[:3])
+        self.slot_size = surface.get_pitch() * height
+        self.shm = shared_memory.SharedMemory(create=True, size=self.slot_size * slots)
+        self.slots = np.ndarray((slots, self.slot_size), np.uint8, self.shm.buf)
+        context = multiprocessing.get_context("spawn")
+        # The spawned encoder imports pygame again; keep its banner quiet
+        os.environ.setdefault("PYGAME_HIDE_SUPPORT_PROMPT", "1")
+        self.ready = context.Queue()
+        self.free = context.Queue()
+        for slot in range(slots):
+            self.free.put(slot)
+        self.process = context.Process(target=encode, name="capture-encoder", daemon=True,
+                                       args=(os.fspath(path), fps, self.layout, self.shm.name,
+                                             self.slot_size, self.ready, self.free))
+        self.process.start()
+        self.frames = self.dropped = 0
+
+    def grab(self, surface, block=False):
+        # Copy one presented frame; returns False if it had to be dropped
+        try:
+            slot = self.free.get(block)
+        except queue.Empty:
+            self.dropped += 1
+            return False
+        self.slots[slot] = np.frombuffer(surface.get_buffer(), np.uint8)
+        self.ready.put((slot, self.frames))
+        self.frames += 1
+        return True
+
+    def close(self):
+        self.ready.put(None)
+        self.process.join()
+        del self.slots
+        self.shm.close()
+        self.shm.unlink()
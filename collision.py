@@ -0,0 +1,88 @@
+import math
+from engine import GRAVITY, MAX_VEL, FLAP_VEL
+
+# Bird vs pipe collision in two phases. The broad phase walks pipe_queue,
+# which is ordered by x and only holds pipes the bird has not yet passed,
+# and stops at the first pipe starting right of the bird, so at most one or
+# two pairs are ever tested. The narrow phase is either plain boxes or the
+# pixel masks of what is actually drawn.
+
+# The largest bird sprite (the red and blue skins). However it is rotated,
+# its pixels stay inside its rotated bounding box, which the renderer and
+# MaskCollider place at the bird's top-left, so that box bounds anything
+# the masks can hit. Planners keep it clear of the pipes.
+SPRITE_W, SPRITE_H = 54, 44
+
+
+def bird_reach(vel):
+    # (width, height) of that box at the angle the bird is drawn at for vel
+    angle = math.radians(round(vel * -2))
+    cos, sin = abs(math.cos(angle)), abs(math.sin(angle))
+    return math.ceil(SPRITE_W * cos + SPRITE_H * sin), math.ceil(SPRITE_W * sin + SPRITE_H * cos)
+
+
+# Every velocity the bird can have, from a flap's to the maximum fall speed
+VELOCITIES = [FLAP_VEL + k * GRAVITY for k in range(round((MAX_VEL - FLAP_VEL) / GRAVITY) + 1)]
+# Height the bird reaches below its y at each velocity, and the widest it
+# gets right of its x at any
+REACH_H = {vel: bird_reach(vel)[1] for vel in VELOCITIES}
+REACH_W = max(bird_reach(vel)[0] for vel in VELOCITIES)
+# Clearance planners keep from the pipes for positions rounded to whole pixels
+MARGIN = 1
+
+
+def pipes_in_range(pipes, left, right):
+    for pipe in pipes:
+        if pipe.x >= right:
+            break
+        if pipe.right > left:
+            yield pipe
+
+
+def boxes_overlap(a, b):
+    # Same rule as pg.Rect.colliderect, boxes are (left, top, right, bottom)
+    return a[0] < b[2] and b[0] < a[2] and a[1] < b[3] and b[1] < a[3]
+
+
+class BoxCollider:
+    def collides(self, game):
+        box = game.bird.box
+        for pipe in pipes_in_range(game.pipe_queue, box[0], box[2]):
+            if boxes_overlap(box, pipe.top_box) or boxes_overlap(box, pipe.bottom_box):
+                return True
+        return False
+
+
+class MaskCollider:
+    # bird_masks maps skin -> angle -> one pg.mask.Mask per animation frame,
+    # matching the rotated images the renderer draws at the bird's top-left
+    def __init__(self, bird_masks, top_pipe_mask, bottom_pipe_mask):
+        self.bird_masks = bird_masks
+        self.top_pipe = top_pipe_mask
+        self.bottom_pipe = bottom_pipe_mask
+        self.pipe_h = top_pipe_mask.get_size()[1]
+
+    def bird_mask(self, game):
+        angles = self.bird_masks[game.skin]
+        angle = round(game.bird.vel * -2)
+        if angle not in angles:
+            angle = min(angles, key=lambda a: abs(a - angle))
+        return angles[angle][game.bird.index]
+
+    def collides(self, game):
+        mask = self.bird_mask(game)
+        width, height = mask.get_size()
+        # Positions are rounded the same way the renderer places sprites
+        left, top = round(game.bird.x), round(game.bird.y)
+        bottom = top + height
+        for pipe in pipes_in_range(game.pipe_queue, left, left + width):
+            dx = round(pipe.x) - left
+            top_pipe_y = round(pipe.gap_top) - self.pipe_h
+            if top < top_pipe_y + self.pipe_h and top_pipe_y < bottom:
+                if mask.overlap(self.top_pipe, (dx, top_pipe_y - top)):
+                    return True
+            bottom_pipe_y = round(pipe.gap_bottom)
+            if bottom_pipe_y < bottom and top < bottom_pipe_y + self.pipe_h:
+                if mask.overlap(self.bottom_pipe, (dx, bottom_pipe_y - top)):
+                    return True
+        return False
@@ -0,0 +1,46 @@
+import time
+from collections import deque
+import pygame as pg
+
+# Player input as timestamped actions. pump() drains the pygame event queue
+# and sorts what it finds into flap presses (space or left click, queued
+# with the time they were drained and the click position) and commands
+# (quit, overlay toggle). Being edge events, a press released again before
+# the next drain is still seen. Each simulation tick takes at most one
+# queued flap, so several presses in one frame land on consecutive ticks
+# instead of merging into one.
+
+QUIT, OVERLAY = "quit", "overlay"
+
+
+class InputQueue:
+    def __init__(self):
+        self.flaps = deque()
+        self.pending_commands = []
+
+    def pump(self):
+        now = time.perf_counter()
+        for event in pg.event.get():
+            if event.type == pg.QUIT:
+                self.pending_commands.append(QUIT)
+            elif event.type == pg.KEYDOWN:
+                if event.key == pg.K_SPACE:
+                    self.flaps.append((now, None))
+                elif event.key == pg.K_F3:
+                    self.pending_commands.append(OVERLAY)
+            elif event.type == pg.MOUSEBUTTONDOWN and event.button == 1:
+                self.flaps.append((now, event.pos))
+
+    def commands(self):
+        commands, self.pending_commands = self.pending_commands, []
+        return commands
+
+    def peek_flap(self):
+        return self.flaps[0] if self.flaps else None
+
+    def take_flap(self):
+        # Timestamp of the oldest queued flap, or None
+        return self.flaps.popleft()[0] if self.flaps else None
+
+    def clear(self):
+        self.flaps.clear()
@@ -0,0 +1,278 @@
+import argparse, datetime, functools, random, sys, threading, time
+import engine
+from engine import (HEIGHT, GROUND_Y, GRAVITY, FLAP_VEL, BIRD_X, BIRD_H, PIPE_W, PIPE_H,
+                    WIDTH, ms_to_ticks)
+from collision import VELOCITIES, REACH_H, REACH_W, MARGIN
+
+# Seeded pipe courses with a difficulty curve. A curve sets each pipe's gap,
+# spacing and scroll speed from its index (the score at which it is
+# passed), so when and where pipes move depends on the curve alone. Only
+# the gap heights are random, drawn from random.Random(seed), and the rest
+# is integer arithmetic, so a seed and a curve give the same course on
+# every machine.
+#
+# Every height drawn is checked against the set of bird states (y, vel) that
+# can be alive after the previous pipe, stepped with the engine's own
+# physics, and redrawn if too few of them could get through the new one
+# (see generate), with the bird as tall and wide as collision.REACH_H and
+# REACH_W make it. Sets of states are kept as one bit set of half-pixel y
+# positions per velocity (both move in steps of 0.5), which makes a tick a
+# few dozen shifts on Python ints, forwards or backwards.
+
+# Random draws per pipe, taking the first that at least FAIR of the ways
+# past the previous pipe get through
+TRIES = 16
+FAIR = 0.75
+# Bit sets are indexed like collision.VELOCITIES
+VELS = len(VELOCITIES)
+# For each velocity index, the index after gravity and the move in half pixels
+MOVES = [(k, round(2 * VELOCITIES[k])) for k in (min(k + 1, VELS - 1) for k in range(VELS))]
+
+
+class CourseError(ValueError):
+    pass
+
+
+class Curve:
+    # Each setting goes linearly from its first to its second value over the
+    # first ramp pipes and stays there. frequency is in ms like
+    # engine.FREQUENCY.
+    def __init__(self, gap=(engine.GAP, engine.GAP), frequency=(engine.FREQUENCY, engine.FREQUENCY),
+                 scroll_spd=(engine.SCROLL_SPD, engine.SCROLL_SPD), ramp=1,
+                 pipe_height_range=engine.PIPE_HEIGHT_RANGE):
+        self.gap = gap
+        self.frequency = frequency
+        self.scroll_spd = scroll_spd
+        self.ramp = ramp
+        self.pipe_height_range = tuple(pipe_height_range)
+        low, high = pipe_height_range
+        for gap in self.gap:
+            if HEIGHT // 2 + high - gap // 2 > PIPE_H or HEIGHT // 2 + low + gap // 2 + PIPE_H < GROUND_Y:
+                raise CourseError("pipes must reach from the gap to the top and the ground")
+
+    def lerp(self, values, index):
+        first, last = values
+        return first + (last - first) * min(index, self.ramp) // self.ramp
+
+    def at(self, index):
+        # (gap, ticks since the previous pipe, scroll speed) of pipe index
+        return (self.lerp(self.gap, index), ms_to_ticks(self.lerp(self.frequency, index)),
+                self.lerp(self.scroll_spd, index))
+
+
+CURVES = {
+    # The fixed settings of the classic game
+    "steady": Curve(),
+    "ramp": Curve(gap=(200, 140), frequency=(1500, 1150), scroll_spd=(4, 6), ramp=60),
+    "daily": Curve(gap=(200, 150), frequency=(1400, 1200), scroll_spd=(4, 5), ramp=40),
+}
+
+
+def daily_seed(day=None):
+    # The same seed for everyone on a given UTC day, e.g. 20261018
+    day = day or datetime.datetime.now(datetime.timezone.utc).date()
+    return int(day.strftime("%Y%m%d"))
+
+
+class Entry:
+    # Pipe pair index spawns ticks after the previous one with its gap
+    # centred on y; from then on everything scrolls at scroll_spd
+    __slots__ = ("index", "ticks", "y", "gap", "scroll_spd")
+
+    def __init__(self, index, ticks, y, gap, scroll_spd):
+        self.index = index
+        self.ticks = ticks
+        self.y = y
+        self.gap = gap
+        self.scroll_spd = scroll_spd
+
+    def __repr__(self):
+        return f"Entry({self.index}, ticks={self.ticks}, y={self.y}, gap={self.gap}, scroll_spd={self.scroll_spd})"
+
+
+def windows(curve):
+    # Yields the (first, last) tick during which each pipe overlaps the bird
+    # horizontally, in pipe order. Same movement rules as engine.Game.step.
+    tick = index = 0
+    speed = curve.at(0)[2]
+    next_spawn = 1
+    pipes = []
+    while True:
+        tick += 1
+        for pipe in pipes:
+            pipe[0] -= speed
+        if tick == next_spawn:
+            speed = curve.at(index)[2]
+            pipes.append([WIDTH, None, None])
+            index += 1
+            next_spawn = tick + curve.at(index)[1]
+        while pipes and BIRD_X > pipes[0][0] + PIPE_W:
+            _, first, last = pipes.pop(0)
+            yield first, last
+        for pipe in pipes:
+            if pipe[0] >= BIRD_X + REACH_W:
+                break
+            if pipe[0] + PIPE_W > BIRD_X:
+                if pipe[1] is None:
+                    pipe[1] = tick
+                pipe[2] = tick
+
+
+def allowed(low, high):
+    # Bit set of the half-pixel positions y2 with low <= y2 / 2 <= high
+    low2, high2 = max(round(2 * low), 0), round(2 * high)
+    if high2 < low2:
+        return 0
+    return ((1 << (high2 + 1)) - 1) ^ ((1 << low2) - 1)
+
+
+def step(rows, masks):
+    # One tick forward for every state at once: gravity and the move, then
+    # the velocity either kept or reset by a flap, then the collision rules,
+    # one mask per velocity
+    moved = [0] * VELS
+    for row, (k, dy2) in zip(rows, MOVES):
+        if row:
+            moved[k] |= row << dy2 if dy2 >= 0 else row >> -dy2
+    flapped = 0
+    for row in moved:
+        flapped |= row
+    moved[0] = flapped
+    return [row & mask for row, mask in zip(moved, masks)]
+
+
+def step_back(rows, masks):
+    # The states allowed by masks from which one tick leads into rows
+    flapped = rows[0]
+    return [((rows[k] | flapped) >> dy2 if dy2 >= 0 else (rows[k] | flapped) << -dy2) & mask
+            for (k, dy2), mask in zip(MOVES, masks)]
+
+
+def generate(seed, curve):
+    # Lazily yields the Entry of every pipe in order. Between pipes it
+    # tracks every state the bird can be in after the last one placed, less
+    # those the ceiling or ground would kill anyway. A height is used if at
+    # least FAIR of them can get through the new pipe, else the best of
+    # TRIES draws, else the nearest height any of them gets through. So the
+    # whole course is solvable, and a player past one pipe is rarely left
+    # without a way through the next however they got there.
+    rng = random.Random(seed)
+    low_range, high_range = curve.pipe_height_range
+    ground = [allowed(0, GROUND_Y - BIRD_H - 0.5)] * VELS
+    rows = [0] * VELS
+    rows[round(-FLAP_VEL / GRAVITY)] = 1 << (2 * (HEIGHT // 2))
+    tick = 0
+    last_y = HEIGHT // 2
+
+    def viable(first, last, pipe_masks):
+        # States at tick that can stay alive until last
+        back = pipe_masks
+        for t in range(last - 1, tick - 1, -1):
+            back = step_back(back, pipe_masks if t >= first else ground)
+        return back
+
+    for index, (first, last) in enumerate(windows(curve)):
+        gap, ticks, scroll_spd = curve.at(index)
+        if first <= tick:
+            raise CourseError(f"pipes {index - 1} and {index} overlap the bird at once, spacing is too short")
+        free = viable(first, last, ground)
+        alive = [row & free_row for row, free_row in zip(rows, free)]
+        if not any(alive):
+            raise CourseError(f"seed {seed}: no way past pipe {index - 1}")
+
+        def share(y):
+            # (part of those states that can get through, the pipe's masks)
+            pair = engine.PipePair(0, y, gap)
+            pipe_masks = [row & allowed(pair.gap_top + MARGIN, pair.gap_bottom - MARGIN - height)
+                          for row, height in zip(ground, map(REACH_H.get, VELOCITIES))]
+            through = viable(first, last, pipe_masks)
+            return sum((row & through_row).bit_count() for row, through_row in zip(alive, through)) / total, pipe_masks
+
+        total = sum(row.bit_count() for row in alive)
+        best = (0, None, None)
+        for _ in range(TRIES):
+            y = HEIGHT // 2 + rng.randint(low_range, high_range)
+            part, pipe_masks = share(y)
+            if part > best[0]:
+                best = (part, y, pipe_masks)
+            if part >= FAIR:
+                break
+        part, y, pipe_masks = best
+        if not part:
+            # Nearest the last gap first, the easiest transition
+            for h in sorted(range(low_range, high_range + 1), key=lambda h: (abs(HEIGHT // 2 + h - last_y), h)):
+                y = HEIGHT // 2 + h
+                part, pipe_masks = share(y)
+                if part:
+                    break
+            else:
+                raise CourseError(f"seed {seed}: no solvable height for pipe {index}")
+
+        while tick < last:
+            tick += 1
+            rows = step(rows, pipe_masks if tick >= first else ground)
+        last_y = y
+        yield Entry(index, 1 if index == 0 else ticks, y, gap, scroll_spd)
+
+
+class Course:
+    # The entries of one seeded course, generated on demand and kept, so a
+    # restart or replay of the seed costs nothing. fill() generates ahead,
+    # typically on a worker thread, so the game only reads entries that
+    # already exist; misses counts the ones it had to wait for.
+    def __init__(self, seed, curve="steady"):
+        if curve not in CURVES:
+            raise CourseError(f"unknown curve {curve!r}, expected one of {sorted(CURVES)}")
+        self.seed = seed
+        self.curve = curve
+        self.entries = []
+        self.source = generate(seed, CURVES[curve])
+        self.lock = threading.Lock()
+        self.misses = 0
+
+    def __getitem__(self, index):
+        if index >= len(self.entries):
+            self.misses += 1
+            self.fill(index + 1)
+        return self.entries[index]
+
+    def fill(self, count):
+        # One entry per lock hold, so a reader waits for at most one
+        while len(self.entries) < count:
+            with self.lock:
+                if len(self.entries) < count:
+                    self.entries.append(next(self.source))
+
+
+@functools.lru_cache(maxsize=8)
+def get_course(seed, curve="steady"):
+    return Course(seed, curve)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Generate a seeded pipe course and print its entries.")
+    parser.add_argument("--curve", default="steady", choices=sorted(CURVES))
+    parser.add_argument("--seed", type=int, help="defaults to today's daily seed")
+    parser.add_argument("--pipes", type=int, default=100)
+    parser.add_argument("--quiet", action="store_true", help="only print the timing")
+    args = parser.parse_args(argv)
+
+    seed = daily_seed() if args.seed is None else args.seed
+    course = Course(seed, args.curve)
+    start = time.perf_counter()
+    try:
+        course.fill(args.pipes)
+    except CourseError as e:
+        print(f"error: {e}", file=sys.stderr)
+        return 1
+    elapsed = time.perf_counter() - start
+    if not args.quiet:
+        for entry in course.entries:
+            print(f"{entry.index:>5} +{entry.ticks:<4} y={entry.y:<4} gap={entry.gap:<4} speed={entry.scroll_spd}")
+    print(f"seed {seed} curve {args.curve}: {args.pipes} pipes in {elapsed * 1000:.0f} ms "
+          f"({elapsed / args.pipes * 1e6:.0f} us/pipe)", file=sys.stderr)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,246 @@
+import random
+from collections import deque
+
+# Headless game rules. Everything here is counted in fixed ticks of 1/FPS
+# seconds and driven by an explicit flap input and a seeded RNG, so runs can
+# be simulated without a window, audio or the wall clock. Positions are
+# floats; renderers round (and may interpolate) them when drawing.
+#
+# Pipe heights come from the seeded RNG by default. With course set to one
+# of course.CURVES, gaps, spacing, speed and heights come from that seeded
+# course instead, entries generated ahead of time by course.Course.
+
+FPS = 60
+STEP = 1 / FPS
+WIDTH = 864
+HEIGHT = 936
+GROUND_Y = 768
+
+# Bird physics
+GRAVITY = 0.5
+MAX_VEL = 8
+FLAP_VEL = -10
+BIRD_X = 100
+BIRD_W, BIRD_H = 51, 36
+
+# Pipes
+PIPE_W, PIPE_H = 78, 560
+SCROLL_SPD = 4
+GAP = 200
+FREQUENCY = 1500
+PIPE_HEIGHT_RANGE = (-300, 100)
+
+GROUND_LOOP = 35
+NYEPI_MS = 1500
+CLOSE_SHAVE = 10
+SKIN_TIERS = [(10, "red"), (25, "blue"), (50, "asli")]
+
+# Event kinds returned by Game.step
+FLAP = "flap"
+SPAWN = "spawn"
+POINT = "point"
+SKIN = "skin"
+ACHIEVEMENT = "achievement"
+DEATH = "death"
+
+
+def ms_to_ticks(ms):
+    return round(ms * FPS / 1000)
+
+
+class BirdState:
+    __slots__ = ("x", "y", "vel", "index", "counter")
+
+    def __init__(self, x=BIRD_X, y=HEIGHT // 2):
+        self.x = x
+        self.y = y
+        self.vel = 0
+        self.index = 0
+        self.counter = 0
+
+    @property
+    def left(self):
+        return self.x
+
+    @property
+    def right(self):
+        return self.x + BIRD_W
+
+    @property
+    def top(self):
+        return self.y
+
+    @property
+    def bottom(self):
+        return self.y + BIRD_H
+
+    @property
+    def box(self):
+        return (self.x, self.y, self.x + BIRD_W, self.y + BIRD_H)
+
+
+class PipePair:
+    __slots__ = ("x", "y", "gap")
+
+    def __init__(self, x, y, gap=GAP):
+        self.x = x
+        self.y = y
+        self.gap = gap
+
+    @property
+    def right(self):
+        return self.x + PIPE_W
+
+    @property
+    def gap_top(self):
+        return self.y - self.gap // 2
+
+    @property
+    def gap_bottom(self):
+        return self.y + self.gap // 2
+
+    @property
+    def top_box(self):
+        return (self.x, self.gap_top - PIPE_H, self.right, self.gap_top)
+
+    @property
+    def bottom_box(self):
+        return (self.x, self.gap_bottom, self.right, self.gap_bottom + PIPE_H)
+
+
+class Game:
+    def __init__(self, seed=None, scroll_spd=SCROLL_SPD, gap=GAP, frequency=FREQUENCY,
+                 pipe_height_range=PIPE_HEIGHT_RANGE, collider=None, course=None):
+        if collider is None:
+            # Imported here as collision builds on this module
+            from collision import BoxCollider
+            collider = BoxCollider()
+        self.collider = collider
+        self.params = {"scroll_spd": scroll_spd, "gap": gap, "frequency": frequency,
+                       "pipe_height_range": tuple(pipe_height_range), "course": course}
+        self.scroll_spd = scroll_spd
+        self.gap = gap
+        self.frequency = ms_to_ticks(frequency)
+        self.pipe_height_range = pipe_height_range
+        self.curve = course
+        self.reset(seed)
+
+    def reset(self, seed=None):
+        self.seed = seed
+        self.rng = random.Random(seed)
+        self.bird = BirdState()
+        self.pipes = deque()
+        self.pipe_queue = deque()
+        self.tick = 0
+        self.last_pipe = -self.frequency
+        self.spawned = 0
+        self.course = None
+        if self.curve is not None:
+            # Imported here as course builds on this module
+            from course import CURVES, Course, get_course
+            self.course = Course(seed, self.curve) if seed is None else get_course(seed, self.curve)
+            self.scroll_spd = CURVES[self.curve].at(0)[2]
+        self.ground_scroll = 0
+        self.score = 0
+        self.flap_count = 0
+        self.last_flap = 0
+        self.tier = 0
+        self.alive = True
+        self.death_cause = None
+        self.triggered = set()
+
+    def step(self, flap=False):
+        if not self.alive:
+            return []
+        events = []
+        self.tick += 1
+        bird = self.bird
+
+        bird.vel = min(bird.vel + GRAVITY, MAX_VEL)
+        if bird.bottom < GROUND_Y:
+            bird.y += bird.vel
+        if flap:
+            bird.vel = FLAP_VEL
+            self.flap_count += 1
+            self.last_flap = self.tick
+            events.append((FLAP, None))
+        bird.counter += 1
+        if bird.counter > 5:
+            bird.counter = 0
+            bird.index = (bird.index + 1) % 3
+
+        for pipe in self.pipes:
+            pipe.x -= self.scroll_spd
+        while self.pipes and self.pipes[0].right < 0:
+            self.pipes.popleft()
+
+        if self.course is None:
+            if self.tick - self.last_pipe >= self.frequency:
+                self._spawn(HEIGHT // 2 + self.rng.randint(*self.pipe_height_range), self.gap, events)
+        else:
+            entry = self.course[self.spawned]
+            if self.tick - self.last_pipe >= entry.ticks:
+                self.scroll_spd = entry.scroll_spd
+                self._spawn(entry.y, entry.gap, events)
+
+        self.ground_scroll -= self.scroll_spd
+        if abs(self.ground_scroll) > GROUND_LOOP:
+            self.ground_scroll = 0
+
+        if self.pipe_queue and bird.left > self.pipe_queue[0].right:
+            pipe = self.pipe_queue.popleft()
+            if abs(bird.top - pipe.gap_top) < CLOSE_SHAVE or abs(bird.bottom - pipe.gap_bottom) < CLOSE_SHAVE:
+                self._trigger("close_shave", events)
+            self.score += 1
+            events.append((POINT, self.score))
+            if self.score == 3 and self.flap_count <= 10:
+                self._trigger("zen_flapper", events)
+            if self.tier < len(SKIN_TIERS) and self.score >= SKIN_TIERS[self.tier][0]:
+                events.append((SKIN, SKIN_TIERS[self.tier][1]))
+                self.tier += 1
+
+        if self.tick - self.last_flap > ms_to_ticks(NYEPI_MS):
+            self._trigger("nyepi", events)
+
+        if bird.top < 0:
+            self._trigger("icarus", events)
+            self._die("ceiling", events)
+        elif self.collides():
+            self._die("pipe", events)
+        elif bird.bottom >= GROUND_Y:
+            self._trigger("grounded", events)
+            self._die("ground", events)
+        return events
+
+    @property
+    def skin(self):
+        return SKIN_TIERS[self.tier - 1][1] if self.tier else "default"
+
+    def collides(self):
+        return self.collider.collides(self)
+
+    def _spawn(self, y, gap, events):
+        pipe = PipePair(WIDTH, y, gap)
+        self.pipes.append(pipe)
+        self.pipe_queue.append(pipe)
+        self.last_pipe = self.tick
+        self.spawned += 1
+        events.append((SPAWN, pipe))
+
+    def _trigger(self, event_id, events):
+        if event_id not in self.triggered:
+            self.triggered.add(event_id)
+            events.append((ACHIEVEMENT, event_id))
+
+    def _die(self, cause, events):
+        self.alive = False
+        self.death_cause = cause
+        events.append((DEATH, cause))
+
+
+def run_episode(policy, seed=None, max_ticks=100_000, **params):
+    # Play one headless run; policy(game) returns True to flap this tick
+    game = Game(seed, **params)
+    while game.alive and game.tick < max_ticks:
+        game.step(policy(game))
+    return game
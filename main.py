@@ -1,69 +1,61 @@
+import time
+# Taken before the heavy imports so the startup report includes them
+STARTUP_BEGIN = time.perf_counter()
 import pygame as pg
 import random
-from collections import deque
-import pathlib, json, sys, os
-
-def resource_path(rel_path: str) -> str:
-    base_path = getattr(sys, "_MEIPASS", os.path.abspath("."))
-    return os.path.join(base_path, rel_path)
+import argparse, pathlib, os, json
+import multiprocessing
+import functools
+from concurrent.futures import ThreadPoolExecutor
+import numpy as np
+import engine
+from engine import FPS, STEP, WIDTH, HEIGHT, GROUND_Y
+from assets import Assets, FontCache, SkinAtlas, open_bundle, BIRD_ANGLES, DEAD_ANGLE, build_mask_collider
+from render import Renderer, shade
+from particles import ParticleSystem, circle_sheet, tile_cells
+from storage import SaveStore
+from achievements import AchievementEngine
+from replay import Replay
+from profiler import FrameProfiler, LatencyMeter, PerformanceOverlay, StartupTimer, TimedCollider
+from controls import InputQueue, QUIT, OVERLAY
+from autopilot import Autopilot
+from capture import FrameCapture
+from course import CURVES, daily_seed
+
+parser = argparse.ArgumentParser(description="Flappy Bird")
+parser.add_argument("--replay", type=pathlib.Path, help="watch a recorded replay")
+parser.add_argument("--full-redraw", action="store_true", help="repaint the whole screen every frame")
+parser.add_argument("--fps", type=int, default=FPS, help="render frame rate cap, 0 for uncapped")
+parser.add_argument("--profile", action="store_true", help="time every frame phase from the start (F3 toggles the overlay)")
+parser.add_argument("--profile-out", type=pathlib.Path, help="write the frame timings to this .csv or .json on exit")
+parser.add_argument("--autopilot", action="store_true", help="let the game play itself, nothing is saved")
+parser.add_argument("--autopilot-budget", type=float, default=4.0, help="autopilot search time per tick in ms")
+parser.add_argument("--capture", help="record the frames shown to a .y4m, raw RGB or frame_%%05d.png sequence")
+parser.add_argument("--offline", action="store_true", help="with --replay and --capture, render every tick as fast as possible and exit")
+parser.add_argument("--course", choices=sorted(CURVES), help="play a seeded pipe course with this difficulty curve")
+parser.add_argument("--daily", action="store_true", help="play today's daily course, the same for everyone")
+parser.add_argument("--startup-report", action="store_true", help="print how long each startup phase took")
 
 APP_DIR  = pathlib.Path(os.getenv("APPDATA", pathlib.Path.home())) / "FlappyBird"
-APP_DIR.mkdir(exist_ok=True)
 
+SAVE_PATH = APP_DIR / "save.json"
+REPLAY_DIR = APP_DIR / "replays"
+# Pre-save.json files, imported on first launch
 HS_PATH  = APP_DIR / "highscore.txt"
 ACHIEVEMENTS_PATH = APP_DIR / "achievements.json"
 
-def load_highscore() -> int:
-    try:
-        return int(HS_PATH.read_text())
-    except (FileNotFoundError, ValueError):
-        return 0
+def load_achievements(master_list: list) -> list:
+    saved_status = store.achievements
+    for achievement in master_list:
+        if achievement["name"] in saved_status:
+            achievement["unlocked"] = saved_status[achievement["name"]]
+    return master_list
 
-def save_highscore(val: int):
-    HS_PATH.write_text(str(val))
+# The simulation always advances in STEP-sized ticks; when rendering falls
+# behind, up to this many ticks are caught up in one frame before time is
+# dropped
+MAX_STEPS_PER_FRAME = 5
 
-def load_achievements(master_list: list) -> list:
-    try:
-        with open(ACHIEVEMENTS_PATH, 'r') as f:
-            saved_achievements = json.load(f)
-        saved_status = {ach["name"]: ach["unlocked"] for ach in saved_achievements}
-        for achievement in master_list:
-            if achievement["name"] in saved_status:
-                achievement["unlocked"] = saved_status[achievement["name"]]
-        return master_list
-    except (FileNotFoundError, json.JSONDecodeError):
-        return master_list
-
-def save_achievements(achievements_to_save: list):
-    with open(ACHIEVEMENTS_PATH, 'w') as f:
-        json.dump(achievements_to_save, f, indent=4)
-
-pg.init()
-pg.mixer.init()
-
-jump_sfx = pg.mixer.Sound(resource_path('sound/sfx_wing.mp3'))
-point_sfx = pg.mixer.Sound(resource_path('sound/sfx_point.mp3'))
-crash_sfx = pg.mixer.Sound(resource_path('sound/crash.mp3'))
-powerup_sfx = pg.mixer.Sound(resource_path('sound/sfx_pop.mp3'))
-
-
-clock = pg.time.Clock()
-FPS = 60
-WIDTH = 864
-HEIGHT = 936
-
-screen = pg.display.set_mode((WIDTH, HEIGHT))
-pg.display.set_caption('Flappy Bird')
-icon = pg.image.load(resource_path('img/bird2.png'))
-pg.display.set_icon(icon)
-
-# Define font and color
-font = pg.font.SysFont('Bauhaus 93', 60)
-achievement_font = pg.font.SysFont('Bauhaus 93', 35)
-desc_font = pg.font.SysFont('Arial', 20)
-button_font = pg.font.SysFont('Bauhaus 93', 30)
-patch_notes_font_title = pg.font.SysFont('Bauhaus 93', 50)
-patch_notes_font_body = pg.font.SysFont('Arial', 24)
 WHITE = (255, 255, 255)
 GREY = (128, 128, 128)
 GOLD = (255, 215, 0)
@@ -71,20 +63,15 @@ GOLD = (255, 215, 0)
 # Game state and variables
 game_state = "start_menu"
 patch_notes_shown_this_session = False
-gr_scroll = 0
-scroll_spd = 4
-gap = 200
-frequency = 1500
-last_pipe = pg.time.get_ticks() - frequency
+# Course pipes are generated this many ahead on the preload thread
+COURSE_AHEAD = 8
+capture = None
+prev_ground_scroll = 0
+current_replay = None
+replay_player = None
 score = 0
-high_score = load_highscore()
-pipe_queue = deque()
+high_score = 0
 game_over_time = 0
-bird_tier = 0
-
-# Gameplay variables for achievements
-flap_count = 0
-time_of_last_flap = 0
 
 # Achievement Variable Lists
 master_achievements_list = [
@@ -97,149 +84,254 @@ master_achievements_list = [
     {"type": "event", "id": "zen_flapper", "name": "Zen Flapper", "description": "Score 3 with 10 flaps or less.", "unlocked": False},
     {"type": "event", "id": "nyepi", "name": "Nyepi Silence", "description": "Survive for 1 second without flapping.", "unlocked": False}
 ]
-achievements = load_achievements(master_achievements_list)
 achievement_text = ""
 achievement_display_timer = 0
 
-# Load Images
-bg = pg.image.load(resource_path('img/bg.png'))
-ground = pg.image.load(resource_path('img/ground.png'))
-restart_btn_img = pg.image.load(resource_path('img/restart.png'))
+@functools.lru_cache(maxsize=512)
+def render_text(text, font, text_color, antialias=True):
+    return font.render(text, antialias, text_color)
 
-def draw_text(text, font, text_color, x, y, center=True):
-    img = font.render(text, True, text_color)
-    if center:
-        rect = img.get_rect(center=(x, y))
-    else:
-        rect = img.get_rect(midleft=(x, y))
-    screen.blit(img, rect)
-
-def draw_wrapped_text(surface, text, font, color, rect):
+@functools.lru_cache(maxsize=64)
+def wrap_text(text, font, width):
     words = text.split(' ')
     lines = []
     current_line = ""
     for word in words:
         test_line = current_line + word + " "
-        if font.size(test_line)[0] < rect.width:
+        if font.size(test_line)[0] < width:
             current_line = test_line
         else:
             lines.append(current_line)
             current_line = word + " "
     lines.append(current_line)
+    return tuple(lines)
+
+@functools.lru_cache(maxsize=16)
+def rounded_panel(size, color, radius=10):
+    panel = pg.Surface(size, pg.SRCALPHA)
+    pg.draw.rect(panel, color, panel.get_rect(), border_radius=radius)
+    return panel
+
+def text_item(text, font, text_color, x, y, center=True):
+    img = render_text(text, font, text_color)
+    if center:
+        rect = img.get_rect(center=(x, y))
+    else:
+        rect = img.get_rect(midleft=(x, y))
+    return img, rect
+
+def wrapped_text_items(text, font, color, rect):
+    items = []
     y = rect.top
-    for line in lines:
-        img = font.render(line, True, color)
-        surface.blit(img, (rect.left, y))
+    for line in wrap_text(text, font, rect.width):
+        items.append((render_text(line, font, color), (rect.left, y)))
         y += font.get_linesize()
-    return y
+    return items, y
+
+def draw_text(text, font, text_color, x, y, center=True):
+    renderer.blit(*text_item(text, font, text_color, x, y, center))
 
 def draw_achievement_notification(text, font, text_color, x, y):
-    img = font.render(text, True, text_color)
-    rect = img.get_rect(center=(x, y))
-    bg_surface = pg.Surface(rect.inflate(20, 20).size, pg.SRCALPHA)
-    pg.draw.rect(bg_surface, (0, 0, 0, 150), bg_surface.get_rect(), border_radius=10)
-    screen.blit(bg_surface, rect.inflate(20, 20).topleft)
-    screen.blit(img, rect)
-
-def check_achievements(current_score):
-    for ach in achievements:
-        if ach.get("type") == "score" and not ach["unlocked"] and current_score >= ach["req"]:
-            unlock_achievement(ach)
-    # Zen Flapper
-    if current_score == 3 and flap_count <= 10:
-        unlock_event_achievement("zen_flapper")
-
-def unlock_event_achievement(event_id):
-    for ach in achievements:
-        if ach.get("type") == "event" and ach.get("id") == event_id and not ach["unlocked"]:
-            unlock_achievement(ach)
-            break
+    img, rect = text_item(text, font, text_color, x, y)
+    renderer.blit(rounded_panel(rect.inflate(20, 20).size, (0, 0, 0, 150)), rect.inflate(20, 20).topleft)
+    renderer.blit(img, rect)
 
 def unlock_achievement(achievement_to_unlock):
     global achievement_text, achievement_display_timer
     achievement_to_unlock["unlocked"] = True
     achievement_text = f"UNLOCKED: {achievement_to_unlock['name']}"
     achievement_display_timer = pg.time.get_ticks()
-    save_achievements(achievements)
-
-def reset_game():
-    global score, last_pipe, flap_count, time_of_last_flap, bird_tier
-    pipe_group.empty()
-    pipe_queue.clear()
-    explosion_group.empty()
-    effect_group.empty()
-    bird_group.add(flappy)       
-    flappy.rect.x = 100
-    flappy.rect.y = int(HEIGHT / 2)
-    flappy.vel = 0
+    store.unlock(achievement_to_unlock["name"])
+
+def reset_game(seed=None, replay=None):
+    global score, world, current_replay, replay_player, prev_ground_scroll
+    if replay is not None:
+        seed = replay.seed
+        if replay.params != world.params:
+            world = engine.Game(seed, collider=world.collider, **replay.params)
+    elif seed is None:
+        seed = daily_seed() if args.daily else random.getrandbits(32)
+    world.reset(seed)
+    prefetch_course()
+    current_replay = Replay.record(world)
+    replay_player = replay.player() if replay is not None else None
+    if autopilot is not None:
+        autopilot.reset()
+    for pipe in pipe_group.sprites():
+        pipe.kill()
+    explosions.clear()
+    effects.clear()
+    bird_group.add(flappy)
     flappy.change_skin('default')
-    flappy.index = 0
-    flappy.counter = 0
+    flappy.prev_y = world.bird.y
+    flappy.update()
+    prev_ground_scroll = world.ground_scroll
     score = 0
-    flap_count = 0
-    time_of_last_flap = pg.time.get_ticks()
-    last_pipe = pg.time.get_ticks() - frequency
-    bird_tier = 0
+
+def prefetch_course():
+    if world.course is not None:
+        preloader.submit(world.course.fill, world.spawned + COURSE_AHEAD)
+
+def next_flap():
+    if replay_player is not None:
+        return replay_player.flap(world.tick + 1)
+    if autopilot is not None:
+        return autopilot.flap(world)
+    stamp = inputs.take_flap()
+    if stamp is None:
+        return False
+    latency.applied(stamp)
+    return True
+
+def handle_menu_input():
+    # Presses outside a run start or restart it; a press that starts a run
+    # stays queued and is the run's first flap
+    global game_state
+    if autopilot is not None:
+        # Attract mode: straight into the next run, presses are ignored
+        inputs.clear()
+        if game_state in ("start_menu", "game_over") and pg.time.get_ticks() - game_over_time > 1000:
+            reset_game()
+            game_state = "playing"
+        return
+    if game_state == "playing":
+        if replay_player is not None:
+            inputs.clear()
+        return
+    press = inputs.peek_flap()
+    if press is None:
+        return
+    if game_state == "start_menu":
+        _, pos = press
+        if pos is None or not achievements_button.rect.collidepoint(pos):
+            reset_game()
+            game_state = "playing"
+            return
+    elif game_state == "game_over" and press[1] is None and pg.time.get_ticks() - game_over_time > 1000:
+        reset_game()
+        game_state = "start_menu"
+    inputs.clear()
+
+def fixed_update(flap):
+    global prev_ground_scroll
+    if game_state == "playing":
+        flappy.prev_y = world.bird.y
+        prev_ground_scroll = world.ground_scroll
+        events = world.step(flap)
+        bird_group.update()
+        handle_sim_events(events)
+    if game_state == "playing" or game_state == "game_over":
+        explosions.update()
+    effects.update()
+
+def ground_offset(alpha):
+    # Interpolated ground position, except across the wrap back to 0
+    if game_state == "playing" and prev_ground_scroll >= world.ground_scroll:
+        return round(prev_ground_scroll + (world.ground_scroll - prev_ground_scroll) * alpha)
+    return world.ground_scroll
+
+def draw_scene(alpha=1.0):
+    renderer.set_backdrop(backdrop)
+    renderer.draw_group(bird_group)
+    renderer.draw_group(pipe_group)
+    explosions.draw(renderer)
+    effects.draw(renderer)
+    renderer.blit(ground, (ground_offset(alpha), GROUND_Y))
+
+def crash():
+    global game_state, game_over_time, high_score
+    game_state = "game_over"
+    crash_sfx.result().play()
+    create_explosion(flappy.rect.centerx, flappy.rect.centery, flappy.image)
+    bird_group.remove(flappy)
+    game_over_time = pg.time.get_ticks()
+    if replay_player is not None or autopilot is not None:
+        return
+    current_replay.finish(world)
+    replay_data = current_replay.to_bytes()
+    store.write_file(REPLAY_DIR / "last.fbr", replay_data)
+    store.record_run(score=score, flaps=world.flap_count, ticks=world.tick,
+                     duration=round(world.tick / FPS, 2), cause=world.death_cause, seed=world.seed)
+    if score > high_score:
+        high_score = score
+        store.high_score = high_score
+        store.write_file(REPLAY_DIR / "best.fbr", replay_data)
+
+def handle_sim_events(events):
+    global score
+    for kind, value in events:
+        if kind == engine.FLAP:
+            jump_sfx.play()
+            current_replay.flaps.append(world.tick)
+        elif kind == engine.SPAWN:
+            pipe_group.add(Pipe.spawn(value, 1), Pipe.spawn(value, -1))
+            prefetch_course()
+        elif kind == engine.POINT:
+            score = value
+            achievement_engine.score(score)
+            point_sfx.play()
+        elif kind == engine.SKIN:
+            create_powerup_effect(flappy.rect.centerx, flappy.rect.centery)
+            powerup_sfx.result().play()
+            flappy.change_skin(value)
+        elif kind == engine.ACHIEVEMENT:
+            achievement_engine.event(value)
+        elif kind == engine.DEATH:
+            crash()
 
 class Bird(pg.sprite.Sprite):
-    def __init__(self, x, y):
+    def __init__(self, state, atlas):
         pg.sprite.Sprite.__init__(self)
-        self.skins = {
-            "default": [pg.image.load(resource_path(f'img/bird{n}.png')) for n in range(1, 4)],
-            "red": [pg.image.load(resource_path(f'img/bird_red{n}.png')) for n in range(1, 4)],
-            "blue": [pg.image.load(resource_path(f'img/bird_blue{n}.png')) for n in range(1, 4)],
-            "asli": [pg.image.load(resource_path(f'img/bird_asli{n}.png')) for n in range(1, 4)]
-        }
-        self.images = self.skins["default"]
-        self.index = 0
-        self.image = self.images[self.index]
-        self.rect = self.image.get_rect(center=(x, y))
-        self.counter = 0
-        self.vel = 0
-        self.clicked = False
-
-    def update(self):
-        global flap_count, time_of_last_flap
-        if game_state == "playing":
-            self.vel += 0.5
-            self.vel = min(self.vel, 8)
-            if self.rect.bottom < 768:
-                self.rect.y += int(self.vel)
-            keys = pg.key.get_pressed()
-            if (pg.mouse.get_pressed()[0] == 1 or keys[pg.K_SPACE]) and not self.clicked:
-                self.clicked = True
-                self.vel = -10
-                jump_sfx.play()
-                flap_count += 1
-                time_of_last_flap = pg.time.get_ticks()
-            if pg.mouse.get_pressed()[0] == 0 and not keys[pg.K_SPACE]:
-                self.clicked = False
-            self.counter += 1
-            if self.counter > 5:
-                self.counter = 0
-                self.index = (self.index + 1) % len(self.images)
-            self.image = pg.transform.rotate(self.images[self.index], self.vel * -2)
-        elif game_state == "game_over":
-            self.image = pg.transform.rotate(self.images[self.index], -90)
+        self.atlas = atlas
+        self.state = state
+        self.change_skin("default")
+        self.image = self.rotations[0][0]
+        self.mask = self.masks[0][0]
+        self.rect = pg.Rect(state.x, state.y, engine.BIRD_W, engine.BIRD_H)
+        self.prev_y = state.y
+
+    def update(self, alpha=1.0):
+        # alpha blends between the previous and current simulation tick
+        self.state = world.bird
+        y = self.prev_y + (self.state.y - self.prev_y) * alpha
+        self.rect.topleft = (round(self.state.x), round(y))
+        angle = DEAD_ANGLE if game_state == "game_over" else round(self.state.vel * -2)
+        if angle not in self.rotations:
+            angle = max(min(angle, BIRD_ANGLES[-1]), BIRD_ANGLES[0])
+        self.image = self.rotations[angle][self.state.index]
+        self.mask = self.masks[angle][self.state.index]
     
     def change_skin(self, skin_name):
-        if skin_name in self.skins:
-            self.images = self.skins[skin_name]
+        if skin_name in self.atlas:
+            self.rotations, self.masks = self.atlas[skin_name]
 
 class Pipe(pg.sprite.Sprite):
-    def __init__(self, x, y, position):
-        pg.sprite.Sprite.__init__(self)
-        self.image = pg.image.load(resource_path('img/pipe.png'))
-        self.rect = self.image.get_rect()
+    # Killed pipes go back here and are reused by the next spawn
+    pool = []
+
+    @classmethod
+    def spawn(cls, pair, position):
+        pipe = cls.pool.pop() if cls.pool else cls()
+        pipe.place(pair, position)
+        return pipe
+
+    def place(self, pair, position):
+        self.pair = pair
         if position == 1:
-            self.image = pg.transform.flip(self.image, False, True)
-            self.rect.bottomleft = [x, y - gap // 2]
+            self.image = assets.flipped('img/pipe.png')
+            self.rect = self.image.get_rect(bottomleft=(round(pair.x), round(pair.gap_top)))
         if position == -1:
-            self.rect.topleft = [x, y + gap // 2]
-    def update(self):
-        self.rect.x -= scroll_spd
-        if self.rect.right < 0:
+            self.image = assets.image('img/pipe.png')
+            self.rect = self.image.get_rect(topleft=(round(pair.x), round(pair.gap_bottom)))
+    def update(self, alpha=1.0):
+        # Pipes move at a constant speed, so the previous tick is one scroll back
+        self.rect.x = round(self.pair.x + world.scroll_spd * (1 - alpha))
+        if self.pair.right < 0:
             self.kill()
+    def kill(self):
+        if self.alive():
+            super().kill()
+            Pipe.pool.append(self)
 
 class Button():
     def __init__(self, x, y, image):
@@ -250,7 +342,7 @@ class Button():
         pos = pg.mouse.get_pos()
         if self.rect.collidepoint(pos) and pg.mouse.get_pressed()[0] == 1:
             action = True
-        screen.blit(self.image, (self.rect.x, self.rect.y))
+        renderer.blit(self.image, (self.rect.x, self.rect.y))
         return action
 
 class TextButton():
@@ -261,89 +353,56 @@ class TextButton():
         self.bg_color = bg_color
         self.hover_color = hover_color
         self.clicked = False
+        self.backgrounds = {
+            False: rounded_panel(self.rect.size, bg_color),
+            True: rounded_panel(self.rect.size, hover_color),
+        }
     def draw(self):
         action = False
         pos = pg.mouse.get_pos()
-        bg_surface = pg.Surface((self.rect.width, self.rect.height), pg.SRCALPHA)
-        if self.rect.collidepoint(pos):
-            pg.draw.rect(bg_surface, self.hover_color, bg_surface.get_rect(), border_radius=10)
+        hovered = self.rect.collidepoint(pos)
+        if hovered:
             if pg.mouse.get_pressed()[0] == 1 and not self.clicked:
                 self.clicked = True
                 action = True
-        else:
-            pg.draw.rect(bg_surface, self.bg_color, bg_surface.get_rect(), border_radius=10)
         if pg.mouse.get_pressed()[0] == 0:
             self.clicked = False
-        screen.blit(bg_surface, self.rect.topleft)
+        renderer.blit(self.backgrounds[hovered], self.rect.topleft)
         draw_text(self.text, self.font, WHITE, self.rect.centerx, self.rect.centery)
         return action
 
-class ExplosionParticle(pg.sprite.Sprite):
-    def __init__(self, x, y, image_part):
-        super().__init__()
-        self.image = image_part
-        self.rect = self.image.get_rect(center=(x, y))
-        self.vel = [random.uniform(-5, 5), random.uniform(-5, -1)]
-        self.gravity = 0.3
-    def update(self):
-        if game_state == "playing" or game_state == "game_over":
-            self.vel[1] += self.gravity
-            self.rect.x += int(self.vel[0])
-            self.rect.y += int(self.vel[1])
-            if self.rect.top > HEIGHT:
-                self.kill()
-
-class PowerUpParticle(pg.sprite.Sprite):
-    def __init__(self, x, y):
-        super().__init__()
-        size = random.randint(5, 12)
-        self.image = pg.Surface((size, size), pg.SRCALPHA)
-        color = (random.randint(220, 255), random.randint(100, 220), random.randint(0, 50))
-        pg.draw.circle(self.image, color, self.image.get_rect().center, self.image.get_width() // 2)
-        self.rect = self.image.get_rect(center=(x, y))
-        self.vel = [random.uniform(-6, 6), random.uniform(-6, 6)]
-        self.gravity = 0.1
-        self.alpha = 255
-        self.alpha_decay = random.randint(8, 12)
-    def update(self):
-        self.vel[1] += self.gravity
-        self.rect.x += self.vel[0]
-        self.rect.y += self.vel[1]
-        self.alpha -= self.alpha_decay
-        if self.alpha > 0:
-            self.image.set_alpha(self.alpha)
-        else:
-            self.kill()
+# Particle effects, capped so bursts can never stall a frame
+MAX_EXPLOSION_PARTICLES = 2000
+MAX_EFFECT_PARTICLES = 4000
+particle_rng = np.random.default_rng()
+explosions = ParticleSystem(MAX_EXPLOSION_PARTICLES, kill_y=HEIGHT)
+effects = ParticleSystem(MAX_EFFECT_PARTICLES)
+powerup_colors = [(random.randint(220, 255), random.randint(100, 220), random.randint(0, 50)) for _ in range(16)]
 
 def create_explosion(x, y, image):
-    particles = []
     width, height = image.get_size()
-    tile_size = 16
-    for i in range(0, width, tile_size):
-        for j in range(0, height, tile_size):
-            w = min(tile_size, width - i)
-            h = min(tile_size, height - j)
-            part = image.subsurface(pg.Rect(i, j, w, h))
-            particles.append(ExplosionParticle(x + i - width // 2, y + j - height // 2, part))
-    return particles
-
-def create_powerup_effect(x, y):
-    for _ in range(35):
-        effect_group.add(PowerUpParticle(x, y))
+    cells = tile_cells(width, height, 16)
+    n = len(cells)
+    explosions.emit(x + cells[:, 0] - width // 2 - cells[:, 2] // 2,
+                    y + cells[:, 1] - height // 2 - cells[:, 3] // 2,
+                    particle_rng.uniform(-5, 5, n), particle_rng.uniform(-5, -1, n),
+                    explosions.sheet(image), cells, gravity=0.3)
+
+def create_powerup_effect(x, y, count=35):
+    sheet, powerup_cells = powerup_sheet.result()
+    cells = powerup_cells[particle_rng.integers(len(powerup_cells), size=count)]
+    effects.emit(x - cells[:, 2] // 2, y - cells[:, 3] // 2,
+                 particle_rng.uniform(-6, 6, count), particle_rng.uniform(-6, 6, count),
+                 effects.sheet(sheet), cells, gravity=0.1,
+                 decay=particle_rng.integers(8, 13, count))
 
 # Sprite groups
 bird_group = pg.sprite.Group()
 pipe_group = pg.sprite.Group()
-flappy = Bird(100, int(HEIGHT / 2))
-bird_group.add(flappy)
-explosion_group = pg.sprite.Group()
-effect_group = pg.sprite.Group()
 
-# Button instances
-restart_button = Button(WIDTH // 2 - 50, HEIGHT // 2, restart_btn_img)
-achievements_button = TextButton("ACHIEVEMENTS", WIDTH // 2 - 150, HEIGHT // 2 + 100, 300, 50, button_font)
-back_button = TextButton("BACK", WIDTH // 2 - 150, HEIGHT - 150, 300, 50, button_font)
-continue_button = TextButton("CONTINUE", WIDTH // 2 - 150, HEIGHT // 2 + 200, 300, 50, button_font)
+# Patch notes panel background
+panel_rect = pg.Rect(0, 0, 700, 550)
+panel_rect.center = (WIDTH // 2, HEIGHT // 2)
 
 # Content for the patch notes
 patch_notes_content = [
@@ -353,190 +412,264 @@ patch_notes_content = [
     {"type": "bullet", "text": "Evolve your bird with new colors as you reach higher scores!"}
 ]
 
-run = True
-while run:
-    clock.tick(FPS)
-    screen.blit(bg, (0, 0))
-
-    bg_overlay = pg.Surface((WIDTH, HEIGHT), pg.SRCALPHA)
-    bg_overlay.fill((0, 0, 0, 75))
-    screen.blit(bg_overlay, (0,0))
-
-    bird_group.draw(screen)
-    pipe_group.draw(screen)
-    explosion_group.draw(screen)
-    effect_group.draw(screen)
-    explosion_group.update()
-    effect_group.update()
-    screen.blit(ground, (gr_scroll, 768))
-
-    if not patch_notes_shown_this_session:
-        game_state = "patch_notes"
+# Menu screens are laid out once into (surface, position) lists and rebuilt
+# only when what they show changes
+@functools.lru_cache(maxsize=4)
+def achievements_screen(unlocked):
+    items = [text_item("My Achievements", font, WHITE, WIDTH // 2, 80)]
+    y_pos = 180
+    for achievement, is_unlocked in zip(achievements, unlocked):
+        name_color = WHITE if is_unlocked else GREY
+        desc_color = (200, 200, 200) if is_unlocked else GREY
+        icon = "★" if is_unlocked else "☆"
+        icon_color = GOLD if is_unlocked else GREY
+        items.append(text_item(icon, achievement_font, icon_color, WIDTH // 2 - 250, y_pos, center=True))
+        items.append(text_item(achievement["name"], achievement_font, name_color, WIDTH // 2 - 220, y_pos, center=False))
+        items.append(text_item(achievement["description"], desc_font, desc_color, WIDTH // 2 - 220, y_pos + 30, center=False))
+        y_pos += 80
+    return items
+
+@functools.lru_cache(maxsize=1)
+def patch_notes_screen():
+    items = [(patch_notes_panel, panel_rect)]
+    items.append(text_item("Patch Note 1.1", patch_notes_font_title, WHITE, WIDTH // 2, panel_rect.top + 60))
+    y_pos = panel_rect.top + 140
+    for item in patch_notes_content:
+        if item["type"] == "header":
+            items.append(text_item(item["text"], button_font, WHITE, WIDTH // 2, y_pos))
+            y_pos += 60
+        elif item["type"] == "bullet":
+            text_rect = pg.Rect(panel_rect.left + 50, y_pos, panel_rect.width - 100, 200)
+            items.append(text_item("•", patch_notes_font_body, WHITE, text_rect.left - 20, text_rect.top, center=False))
+            lines, y_pos = wrapped_text_items(item["text"], patch_notes_font_body, WHITE, text_rect)
+            items.extend(lines)
+            y_pos += 15
+    return items
+
+def shutdown():
+    store.close()
+    preloader.shutdown(cancel_futures=True)
+    if autopilot is not None:
+        autopilot.close()
+    if capture is not None:
+        capture.close()
+        print(f"captured {capture.frames} frames to {args.capture}, dropped {capture.dropped}")
+    if args.profile_out:
+        profiler.export(args.profile_out)
+
+def setup(argv=None):
+    # Everything with side effects: the arguments, the window, the save
+    # file and the worker threads. Importing this module does none of it,
+    # so tools and the capture encoder's process can import it freely
+    global args, startup, store, clock, screen, assets, bg, ground, restart_btn_img, backdrop, preloader
+    global crash_sfx, powerup_sfx, jump_sfx, point_sfx, renderer, profiler, inputs, autopilot, latency
+    global perf_overlay, fonts, font, achievement_font, desc_font, button_font, patch_notes_font_title
+    global patch_notes_font_body, world, high_score, achievements, achievement_engine, powerup_sheet
+    global skin_atlas, flappy, restart_button, achievements_button, back_button, continue_button
+    global patch_notes_panel
+    args = parser.parse_args(argv)
+    if args.offline and not (args.replay and args.capture):
+        parser.error("--offline needs --replay and --capture")
+    startup = StartupTimer(STARTUP_BEGIN)
+    startup.mark("imports")
+
+    APP_DIR.mkdir(exist_ok=True)
+
+    store = SaveStore(SAVE_PATH, legacy_highscore=HS_PATH, legacy_achievements=ACHIEVEMENTS_PATH)
+
+    pg.init()
+    pg.mixer.init()
+    startup.mark("pygame init")
+
+    clock = pg.time.Clock()
+
+    # The window comes up showing the background before anything else loads
+    screen = pg.display.set_mode((WIDTH, HEIGHT))
+    pg.display.set_caption('Flappy Bird')
+    assets = Assets(open_bundle())
+    icon = assets.image('img/bird2.png')
+    pg.display.set_icon(icon)
+    bg = assets.image('img/bg.png', alpha=False)
+    ground = assets.image('img/ground.png')
+    restart_btn_img = assets.image('img/restart.png')
+
+    # Background and its darkening overlay composited once
+    backdrop = pg.Surface((WIDTH, HEIGHT)).convert()
+    backdrop.blit(bg, (0, 0))
+    backdrop = shade(backdrop, 75)
+    screen.blit(backdrop, (0, 0))
+    pg.display.flip()
+    startup.mark("window")
+
+    # What the menus don't need loads on this worker while they are shown
+    preloader = ThreadPoolExecutor(max_workers=1, thread_name_prefix="preload")
+    crash_sfx = preloader.submit(assets.sound, 'sound/crash.mp3')
+    powerup_sfx = preloader.submit(assets.sound, 'sound/sfx_pop.mp3')
+    jump_sfx = assets.sound('sound/sfx_wing.mp3')
+    point_sfx = assets.sound('sound/sfx_point.mp3')
+    startup.mark("sounds")
+
+    renderer = Renderer(screen, dirty_rects=not args.full_redraw)
+    profiler = FrameProfiler(1000 / (args.fps or FPS), enabled=args.profile or args.profile_out is not None,
+                             keep_frames=args.profile_out is not None)
+    inputs = InputQueue()
+    autopilot = Autopilot(budget_ms=args.autopilot_budget) if args.autopilot else None
+    latency = LatencyMeter()
+    perf_overlay = PerformanceOverlay(profiler, pg.font.Font(None, 20), latency)
+
+    # Define font and color
+    fonts = FontCache(APP_DIR / "fonts.json")
+    font = fonts.font('Bauhaus 93', 60)
+    achievement_font = fonts.font('Bauhaus 93', 35)
+    desc_font = fonts.font('Arial', 20)
+    button_font = fonts.font('Bauhaus 93', 30)
+    patch_notes_font_title = fonts.font('Bauhaus 93', 50)
+    patch_notes_font_body = fonts.font('Arial', 24)
+    if fonts.dirty:
+        store.write_file(fonts.path, json.dumps(fonts.paths))
+    startup.mark("fonts")
+    world = engine.Game(course="daily" if args.daily else args.course)
+    high_score = store.high_score
+    achievements = load_achievements(master_achievements_list)
+    # Autopilot runs unlock nothing
+    achievement_engine = AchievementEngine([] if autopilot else achievements, unlock_achievement)
+
+    powerup_sheet = preloader.submit(circle_sheet, range(5, 13), powerup_colors)
+
+    skin_atlas = SkinAtlas(assets)
+    flappy = Bird(world.bird, skin_atlas)
+    bird_group.add(flappy)
+    # The other skins are only needed from a score of 10 on
+    skin_atlas.preload(preloader)
+
+    # Pixel-accurate hits against the bird frame and pipe actually drawn
+    world.collider = TimedCollider(build_mask_collider(assets, skin_atlas), profiler)
+    startup.mark("sprites")
+
+    # Button instances
+    restart_button = Button(WIDTH // 2 - 50, HEIGHT // 2, restart_btn_img)
+    achievements_button = TextButton("ACHIEVEMENTS", WIDTH // 2 - 150, HEIGHT // 2 + 100, 300, 50, button_font)
+    back_button = TextButton("BACK", WIDTH // 2 - 150, HEIGHT - 150, 300, 50, button_font)
+    continue_button = TextButton("CONTINUE", WIDTH // 2 - 150, HEIGHT // 2 + 200, 300, 50, button_font)
+
+    # Patch notes panel background
+    patch_notes_panel = pg.Surface(panel_rect.size, pg.SRCALPHA)
+    pg.draw.rect(patch_notes_panel, (10, 10, 30), patch_notes_panel.get_rect(), border_radius=15)
+    pg.draw.rect(patch_notes_panel, WHITE, patch_notes_panel.get_rect(), width=2, border_radius=15)
+
+def main(argv=None):
+    global game_state, patch_notes_shown_this_session, achievement_text, capture, startup
+    # In a frozen build the capture encoder starts as this program; run it and exit
+    multiprocessing.freeze_support()
+    setup(argv)
+    offline_tail = FPS
+    if args.replay or args.autopilot:
+        patch_notes_shown_this_session = True
+    if args.replay:
+        reset_game(replay=Replay.load(args.replay))
+        game_state = "playing"
+    capture = FrameCapture(args.capture, screen, FPS) if args.capture else None
+
+    run = True
+    accumulator = 0.0
+    while run:
+        # Offline, every frame is exactly one tick and nothing waits on the clock
+        frame_time = STEP if args.offline else clock.tick(args.fps) / 1000
+        accumulator = min(accumulator + frame_time, MAX_STEPS_PER_FRAME * STEP)
+        profiler.begin_frame()
+
+        # Input is drained right before the ticks that consume it; a queued
+        # flap waits for the next tick if this frame runs none
+        inputs.pump()
+        for command in inputs.commands():
+            if command == QUIT:
+                run = False
+            elif command == OVERLAY:
+                perf_overlay.toggle()
+
+        if not patch_notes_shown_this_session:
+            game_state = "patch_notes"
+        handle_menu_input()
+        profiler.mark("events")
+
+        while accumulator >= STEP:
+            accumulator -= STEP
+            fixed_update(next_flap() if game_state == "playing" else False)
+        alpha = accumulator / STEP if game_state == "playing" else 1.0
+        bird_group.update(alpha)
+        pipe_group.update(alpha)
+        profiler.mark("update")
+
+        draw_scene(alpha)
+        profiler.mark("sprite_draw")
+
+        if game_state == "start_menu":
+            renderer.blit(renderer.overlay(120), (0, 0))
+            draw_text("PRESS SPACEBAR TO START", font, WHITE, WIDTH // 2, HEIGHT // 2)
+            if achievements_button.draw():
+                game_state = "achievements_menu"
+
+        elif game_state == "achievements_menu":
+            renderer.blit(renderer.overlay(150), (0, 0))
+            renderer.blits(achievements_screen(tuple(ach["unlocked"] for ach in achievements)))
+            if back_button.draw():
+                game_state = "start_menu"
 
-    if game_state == "playing":
-        bird_group.update()
-        pipe_group.update()
-        
-        time_now = pg.time.get_ticks()
-        if time_now - last_pipe > frequency:
-            pipe_height = random.randint(-300, 100)
-            top_pipe = Pipe(WIDTH, HEIGHT // 2 + pipe_height, 1)
-            btm_pipe = Pipe(WIDTH, HEIGHT // 2 + pipe_height, -1)
-            pipe_group.add(top_pipe, btm_pipe)
-            pipe_queue.append((top_pipe, btm_pipe))
-            last_pipe = time_now
-
-        gr_scroll -= scroll_spd
-        if abs(gr_scroll) > 35:
-            gr_scroll = 0
-            
-        if len(pipe_queue) > 0:
-            next_top, next_btm = pipe_queue[0]
-            if flappy.rect.left > next_top.rect.right:
-                if abs(flappy.rect.top - next_top.rect.bottom) < 10 or abs(flappy.rect.bottom - next_btm.rect.top) < 10:
-                    unlock_event_achievement("close_shave")
-                score += 1
-                check_achievements(score)
-                point_sfx.play()
-                pipe_queue.popleft()
-
-                if bird_tier == 0 and score >= 10:
-                    create_powerup_effect(flappy.rect.centerx, flappy.rect.centery)
-                    powerup_sfx.play()
-                    flappy.change_skin("red")
-                    bird_tier = 1
-                elif bird_tier == 1 and score >= 25:
-                    create_powerup_effect(flappy.rect.centerx, flappy.rect.centery)
-                    powerup_sfx.play()
-                    flappy.change_skin("blue")
-                    bird_tier = 2
-                elif bird_tier == 2 and score >= 50:
-                    create_powerup_effect(flappy.rect.centerx, flappy.rect.centery)
-                    powerup_sfx.play()
-                    flappy.change_skin("asli")
-                    bird_tier = 3
-
-        # Nyepi
-        if pg.time.get_ticks() - time_of_last_flap > 1500:
-            unlock_event_achievement("nyepi")
-
-        if pg.sprite.groupcollide(bird_group, pipe_group, False, False) or flappy.rect.top < 0:
-            if flappy.rect.top < 0:
-                unlock_event_achievement("icarus")
-            game_state = "game_over"
-            crash_sfx.play()
-            explosion_parts = create_explosion(flappy.rect.centerx, flappy.rect.centery, flappy.image)
-            explosion_group.add(explosion_parts)
-            bird_group.remove(flappy)
-            game_over_time = pg.time.get_ticks()
-            if score > high_score:
-                high_score = score
-                save_highscore(high_score)
-
-        if flappy.rect.bottom >= 768:
-            unlock_event_achievement("grounded")
-            game_state = "game_over"
-            crash_sfx.play()
-            explosion_parts = create_explosion(flappy.rect.centerx, flappy.rect.centery, flappy.image)
-            explosion_group.add(explosion_parts)
-            bird_group.remove(flappy)
-            game_over_time = pg.time.get_ticks()
-            if score > high_score:
-                high_score = score
-                save_highscore(high_score)
-
-    elif game_state == "start_menu":
-        overlay = pg.Surface((WIDTH, HEIGHT), pg.SRCALPHA)
-        overlay.fill((0, 0, 0, 120))
-        screen.blit(overlay, (0, 0))
-        draw_text("PRESS SPACEBAR TO START", font, WHITE, WIDTH // 2, HEIGHT // 2)
-        if achievements_button.draw():
-            game_state = "achievements_menu"
-
-    elif game_state == "achievements_menu":
-        overlay = pg.Surface((WIDTH, HEIGHT), pg.SRCALPHA)
-        overlay.fill((0, 0, 0, 150))
-        screen.blit(overlay, (0, 0))
-        draw_text("My Achievements", font, WHITE, WIDTH // 2, 80)
-        
-        y_pos = 180
-        for achievement in achievements:
-            name_color = WHITE if achievement["unlocked"] else GREY
-            desc_color = (200, 200, 200) if achievement["unlocked"] else GREY
-            icon = "★" if achievement["unlocked"] else "☆"
-            icon_color = GOLD if achievement["unlocked"] else GREY
-            draw_text(icon, achievement_font, icon_color, WIDTH // 2 - 250, y_pos, center=True)
-            draw_text(achievement["name"], achievement_font, name_color, WIDTH // 2 - 220, y_pos, center=False)
-            draw_text(achievement["description"], desc_font, desc_color, WIDTH // 2 - 220, y_pos + 30, center=False)
-            y_pos += 80
-            
-        if back_button.draw():
-            game_state = "start_menu"
-
-    elif game_state == "patch_notes":
-        overlay = pg.Surface((WIDTH, HEIGHT), pg.SRCALPHA)
-        overlay.fill((0, 0, 0, 200))
-        screen.blit(overlay, (0, 0))
-        panel_rect = pg.Rect(0, 0, 700, 550)
-        panel_rect.center = (WIDTH // 2, HEIGHT // 2)
-        pg.draw.rect(screen, (10, 10, 30), panel_rect, border_radius=15)
-        pg.draw.rect(screen, WHITE, panel_rect, width=2, border_radius=15)
-        
-        draw_text("Patch Note 1.1", patch_notes_font_title, WHITE, WIDTH // 2, panel_rect.top + 60)
-        
-        y_pos = panel_rect.top + 140
-        for item in patch_notes_content:
-            if item["type"] == "header":
-                draw_text(item["text"], button_font, WHITE, WIDTH // 2, y_pos)
-                y_pos += 60
-            elif item["type"] == "bullet":
-                text_rect = pg.Rect(panel_rect.left + 50, y_pos, panel_rect.width - 100, 200)
-                draw_text("•", patch_notes_font_body, WHITE, text_rect.left - 20, text_rect.top, center=False)
-                y_pos = draw_wrapped_text(screen, item["text"], patch_notes_font_body, WHITE, text_rect)
-                y_pos += 15
-
-        continue_button.rect.centerx = WIDTH // 2
-        continue_button.rect.bottom = panel_rect.bottom - 40
-        if continue_button.draw():
-            patch_notes_shown_this_session = True
-            game_state = "start_menu"
-
-    elif game_state == "game_over":
-        bird_group.update()
-        overlay = pg.Surface((WIDTH, HEIGHT), pg.SRCALPHA)
-        overlay.fill((0, 0, 0, 120))
-        screen.blit(overlay, (0, 0))
-        draw_text("GAME OVER", font, WHITE, WIDTH // 2, HEIGHT // 2 - 200)
-        draw_text(f"SCORE = {score}", font, WHITE, WIDTH // 2, HEIGHT // 2 - 120)
-        draw_text(f"HIGH SCORE = {high_score}", font, WHITE, WIDTH // 2, HEIGHT // 2 - 40)
-        if pg.time.get_ticks() - game_over_time > 1000:
-            if restart_button.draw():
-                reset_game()
+        elif game_state == "patch_notes":
+            renderer.blit(renderer.overlay(200), (0, 0))
+            renderer.blits(patch_notes_screen())
+            continue_button.rect.centerx = WIDTH // 2
+            continue_button.rect.bottom = panel_rect.bottom - 40
+            if continue_button.draw():
+                patch_notes_shown_this_session = True
                 game_state = "start_menu"
 
-    if game_state == "playing":
-        draw_text(str(score), font, WHITE, WIDTH // 2, 50)
-        if achievement_text and pg.time.get_ticks() - achievement_display_timer < 3000:
-            draw_achievement_notification(achievement_text, button_font, WHITE, WIDTH // 2, 120)
-        else:
-            achievement_text = ""
-
-    for event in pg.event.get():
-        if event.type == pg.QUIT:
-            run = False
-        if game_state != "patch_notes":
-            if event.type == pg.KEYDOWN and event.key == pg.K_SPACE:
-                if game_state == "start_menu":
-                    reset_game()
-                    game_state = "playing"
-                elif game_state == "game_over" and pg.time.get_ticks() - game_over_time > 1000:
+        elif game_state == "game_over":
+            renderer.blit(renderer.overlay(120), (0, 0))
+            draw_text("GAME OVER", font, WHITE, WIDTH // 2, HEIGHT // 2 - 200)
+            draw_text(f"SCORE = {score}", font, WHITE, WIDTH // 2, HEIGHT // 2 - 120)
+            draw_text(f"HIGH SCORE = {high_score}", font, WHITE, WIDTH // 2, HEIGHT // 2 - 40)
+            if pg.time.get_ticks() - game_over_time > 1000:
+                if restart_button.draw():
                     reset_game()
                     game_state = "start_menu"
-            if event.type == pg.MOUSEBUTTONDOWN:
-                if game_state == "start_menu" and not achievements_button.rect.collidepoint(event.pos):
-                    reset_game()
-                    game_state = "playing"
-
-    pg.display.update()
 
-pg.quit()
+        if game_state == "playing":
+            draw_text(str(score), font, WHITE, WIDTH // 2, 50)
+            if achievement_text and pg.time.get_ticks() - achievement_display_timer < 3000:
+                draw_achievement_notification(achievement_text, button_font, WHITE, WIDTH // 2, 120)
+            else:
+                achievement_text = ""
+
+        # misses counts course pipes the game had to wait to be generated
+        perf_overlay.draw(renderer, {"sprites": len(bird_group) + len(pipe_group),
+                                     "particles": len(explosions) + len(effects),
+                                     "dirty": len(renderer.last_dirty),
+                                     "misses": world.course.misses if world.course is not None else 0})
+        profiler.mark("state_ui")
+
+        dirty = renderer.compose()
+        profiler.mark("composite")
+        renderer.flip(dirty)
+        latency.presented()
+        if capture is not None:
+            # Live capture drops frames when the encoder falls behind
+            capture.grab(screen, block=args.offline)
+        profiler.mark("flip")
+        profiler.end_frame()
+        if startup is not None:
+            startup.mark("first frame")
+            if args.startup_report:
+                print(startup.report())
+            startup = None
+        if args.offline and game_state == "game_over":
+            # Keep a second of the crash, then stop
+            offline_tail -= 1
+            if offline_tail <= 0:
+                run = False
+
+    shutdown()
+    pg.quit()
+
+if __name__ == "__main__":
+    main()
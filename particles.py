@@ -0,0 +1,114 @@
+import numpy as np
+import pygame as pg
+
+# Array-backed particle pool. Every live particle is one row of a single
+# float array, updated with a few vectorised operations per frame and drawn
+# as cells of shared sprite sheets through one batched blits() call. Fading
+# uses pre-built alpha levels of each sheet instead of set_alpha() per
+# particle.
+
+X, Y, VX, VY, GRAVITY, ALPHA, DECAY, SHEET, CELL_X, CELL_Y, CELL_W, CELL_H = range(12)
+FIELDS = 12
+
+
+class ParticleSystem:
+    def __init__(self, capacity, kill_y=None, alpha_levels=16):
+        self.capacity = capacity
+        self.kill_y = kill_y
+        self.alpha_levels = alpha_levels
+        self.data = np.zeros((capacity, FIELDS), dtype=np.float64)
+        self.count = 0
+        self.sheets = []
+        self.sheet_ids = {}
+        self.faded = {}
+
+    def __len__(self):
+        return self.count
+
+    def sheet(self, surface):
+        # Index of a sprite sheet, registered on first use
+        if surface not in self.sheet_ids:
+            self.sheet_ids[surface] = len(self.sheets)
+            self.sheets.append(surface)
+        return self.sheet_ids[surface]
+
+    def emit(self, x, y, vx, vy, sheet, cells, gravity=0.0, alpha=255, decay=0):
+        cells = np.atleast_2d(np.asarray(cells))
+        n = min(len(cells), self.capacity - self.count)
+        if n <= 0:
+            return 0
+        rows = self.data[self.count:self.count + n]
+        for field, value in ((X, x), (Y, y), (VX, vx), (VY, vy), (GRAVITY, gravity), (ALPHA, alpha), (DECAY, decay)):
+            rows[:, field] = np.broadcast_to(value, (len(cells),))[:n]
+        rows[:, SHEET] = sheet
+        rows[:, CELL_X:CELL_H + 1] = cells[:n]
+        self.count += n
+        return n
+
+    def update(self):
+        n = self.count
+        if not n:
+            return
+        d = self.data[:n]
+        d[:, VY] += d[:, GRAVITY]
+        d[:, X] += d[:, VX]
+        d[:, Y] += d[:, VY]
+        d[:, ALPHA] -= d[:, DECAY]
+        keep = d[:, ALPHA] > 0
+        if self.kill_y is not None:
+            keep &= d[:, Y] <= self.kill_y
+        if not keep.all():
+            kept = d[keep]
+            self.count = len(kept)
+            self.data[:self.count] = kept
+
+    def draw(self, target):
+        n = self.count
+        if not n:
+            return
+        d = self.data[:n]
+        step = 256 // self.alpha_levels
+        levels = np.minimum(d[:, ALPHA].astype(np.int32) // step, self.alpha_levels - 1).tolist()
+        sheets = d[:, SHEET].astype(np.int32).tolist()
+        corners = d[:, X:Y + 1].astype(np.int32)
+        cells = d[:, CELL_X:CELL_H + 1].astype(np.int32)
+        # Bounds of the whole batch, so the renderer repaints it as one region
+        low = corners.min(axis=0)
+        high = (corners + cells[:, 2:]).max(axis=0)
+        target.blits([(self._surface(sheet, level), pos, cell)
+                      for sheet, level, pos, cell in zip(sheets, levels, corners.tolist(), cells.tolist())],
+                     (*low.tolist(), *(high - low).tolist()))
+
+    def clear(self):
+        self.count = 0
+
+    def _surface(self, sheet, level):
+        if level == self.alpha_levels - 1:
+            return self.sheets[sheet]
+        key = (sheet, level)
+        if key not in self.faded:
+            faded = self.sheets[sheet].copy()
+            faded.set_alpha((level + 1) * 256 // self.alpha_levels - 1)
+            self.faded[key] = faded
+        return self.faded[key]
+
+
+def tile_cells(width, height, tile_size):
+    # (x, y, w, h) of every tile_size square covering a width x height image
+    xs, ys = np.meshgrid(np.arange(0, width, tile_size), np.arange(0, height, tile_size), indexing="ij")
+    xs, ys = xs.ravel(), ys.ravel()
+    return np.stack([xs, ys, np.minimum(tile_size, width - xs), np.minimum(tile_size, height - ys)], axis=1)
+
+
+def circle_sheet(sizes, colors):
+    # One row per colour, one column per size; returns the sheet and the
+    # cell rect of every (size, colour) pair in row-major order
+    cell = max(sizes)
+    sheet = pg.Surface((cell * len(sizes), cell * len(colors)), pg.SRCALPHA)
+    cells = []
+    for row, color in enumerate(colors):
+        for col, size in enumerate(sizes):
+            x, y = col * cell, row * cell
+            pg.draw.circle(sheet, color, (x + size // 2, y + size // 2), size // 2)
+            cells.append((x, y, size, size))
+    return sheet, np.array(cells)
@@ -0,0 +1,210 @@
+import csv, json, pathlib, time
+from collections import deque
+import pygame as pg
+
+# Per-phase frame timing. The loop calls begin_frame(), then mark(phase)
+# after each phase, which charges the time since the previous mark to that
+# phase, and end_frame() once the frame is presented. add() charges time
+# measured elsewhere (e.g. collision inside the update phase, which is
+# therefore also counted in "update"). Every call returns at once while
+# the profiler is disabled.
+
+PHASES = ("events", "update", "collision", "sprite_draw", "state_ui", "composite", "flip")
+
+
+def percentile(sorted_values, q):
+    if not sorted_values:
+        return 0.0
+    return sorted_values[min(len(sorted_values) - 1, int(q / 100 * len(sorted_values)))]
+
+
+class FrameProfiler:
+    # Percentiles cover the last window frames. Every frame's timings are
+    # only kept, for export(), with keep_frames.
+    def __init__(self, budget_ms, window=600, enabled=False, keep_frames=False):
+        self.budget_ns = int(budget_ms * 1_000_000)
+        self.window = window
+        self.enabled = enabled
+        self.keep_frames = keep_frames
+        self.reset()
+
+    def reset(self):
+        self.history = {name: deque(maxlen=self.window) for name in ("frame",) + PHASES}
+        self.frames = []
+        self.count = self.over_budget = 0
+        self.current = dict.fromkeys(PHASES, 0)
+        self.frame_start = self.last_mark = 0
+
+    def begin_frame(self):
+        if not self.enabled:
+            return
+        self.current = dict.fromkeys(PHASES, 0)
+        self.frame_start = self.last_mark = time.perf_counter_ns()
+
+    def mark(self, phase):
+        if not self.enabled:
+            return
+        now = time.perf_counter_ns()
+        self.current[phase] += now - self.last_mark
+        self.last_mark = now
+
+    def add(self, phase, ns):
+        if self.enabled:
+            self.current[phase] += ns
+
+    def end_frame(self):
+        if not self.enabled or not self.frame_start:
+            return
+        total = time.perf_counter_ns() - self.frame_start
+        self.history["frame"].append(total)
+        for name, ns in self.current.items():
+            self.history[name].append(ns)
+        self.count += 1
+        if total > self.budget_ns:
+            self.over_budget += 1
+        if self.keep_frames:
+            self.frames.append((total, *self.current.values()))
+
+    def percentiles(self, name="frame"):
+        values = sorted(self.history[name])
+        return tuple(percentile(values, q) / 1_000_000 for q in (50, 95, 99))
+
+    def summary(self):
+        return {
+            "frames": self.count,
+            "budget_ms": self.budget_ns / 1_000_000,
+            "over_budget": self.over_budget,
+            "percentiles_ms": {name: dict(zip(("p50", "p95", "p99"), self.percentiles(name)))
+                               for name in self.history},
+        }
+
+    def export(self, path):
+        path = pathlib.Path(path)
+        columns = ("frame",) + PHASES
+        if path.suffix == ".csv":
+            with open(path, "w", newline="") as f:
+                writer = csv.writer(f)
+                writer.writerow([f"{name}_ms" for name in columns])
+                for row in self.frames:
+                    writer.writerow([f"{ns / 1_000_000:.4f}" for ns in row])
+        else:
+            data = self.summary()
+            data["columns"] = [f"{name}_ms" for name in columns]
+            data["rows"] = [[round(ns / 1_000_000, 4) for ns in row] for row in self.frames]
+            path.write_text(json.dumps(data))
+
+
+class TimedCollider:
+    # Wraps an engine collider and charges its time to the "collision" phase
+    def __init__(self, collider, profiler):
+        self.collider = collider
+        self.profiler = profiler
+
+    def collides(self, game):
+        if not self.profiler.enabled:
+            return self.collider.collides(game)
+        start = time.perf_counter_ns()
+        hit = self.collider.collides(game)
+        self.profiler.add("collision", time.perf_counter_ns() - start)
+        return hit
+
+
+class LatencyMeter:
+    # Input to screen: from when an input was drained to the end of the flip
+    # of the first frame simulated with it. Time spent in the OS event queue
+    # before the drain is not visible to pygame and not included.
+    def __init__(self, window=240):
+        self.samples = deque(maxlen=window)
+        self.waiting = []
+
+    def applied(self, stamp):
+        self.waiting.append(stamp)
+
+    def presented(self):
+        if self.waiting:
+            now = time.perf_counter()
+            self.samples.extend(now - stamp for stamp in self.waiting)
+            self.waiting.clear()
+
+    def percentiles(self):
+        values = sorted(self.samples)
+        return tuple(percentile(values, q) * 1000 for q in (50, 95, 99))
+
+
+class PerformanceOverlay:
+    # Live frame-time graph and counters, redrawn every few frames so the
+    # overlay itself stays cheap
+    def __init__(self, profiler, font, latency=None, size=(320, 245), refresh=15):
+        self.profiler = profiler
+        self.latency = latency
+        self.font = font
+        self.size = size
+        self.refresh = refresh
+        self.visible = False
+        self.frame = 0
+        self.surface = None
+        self.was_enabled = profiler.enabled
+
+    def toggle(self):
+        # Profiles while shown, then leaves the profiler as it found it
+        self.visible = not self.visible
+        if self.visible:
+            self.was_enabled = self.profiler.enabled
+            self.profiler.enabled = True
+        else:
+            self.profiler.enabled = self.was_enabled
+        self.surface = None
+
+    def draw(self, target, counts):
+        if not self.visible:
+            return
+        self.frame += 1
+        if self.surface is None or self.frame % self.refresh == 0:
+            self.surface = self._render(counts)
+        target.blit(self.surface, (10, 10))
+
+    def _render(self, counts):
+        surface = pg.Surface(self.size, pg.SRCALPHA)
+        surface.fill((0, 0, 0, 170))
+        p50, p95, p99 = self.profiler.percentiles()
+        lines = [f"frame p50 {p50:.2f}  p95 {p95:.2f}  p99 {p99:.2f} ms",
+                 f"over budget {self.profiler.over_budget} / {self.profiler.count}"]
+        if self.latency is not None:
+            p50, p95, p99 = self.latency.percentiles()
+            lines.append(f"input  p50 {p50:.2f}  p95 {p95:.2f}  p99 {p99:.2f} ms")
+        lines += [f"{name:<12}p95 {self.profiler.percentiles(name)[1]:.2f} ms" for name in PHASES]
+        lines.append("  ".join(f"{name} {value}" for name, value in counts.items()))
+        y = 4
+        for line in lines:
+            surface.blit(self.font.render(line, True, (255, 255, 255)), (6, y))
+            y += self.font.get_linesize()
+
+        # Frame-time graph with the budget as a horizontal line
+        graph = pg.Rect(6, y + 4, self.size[0] - 12, self.size[1] - y - 10)
+        if graph.height > 10:
+            scale = graph.height / (2 * self.profiler.budget_ns)
+            budget_y = graph.bottom - int(self.profiler.budget_ns * scale)
+            pg.draw.line(surface, (255, 80, 80), (graph.left, budget_y), (graph.right, budget_y))
+            frames = list(self.profiler.history["frame"])[-graph.width:]
+            points = [(graph.left + i, max(graph.top, graph.bottom - int(ns * scale))) for i, ns in enumerate(frames)]
+            if len(points) > 1:
+                pg.draw.lines(surface, (120, 255, 120), False, points)
+        return surface
+
+
+class StartupTimer:
+    # Wall time of each startup phase. start lets the imports that come
+    # before this module is usable be counted as well
+    def __init__(self, start=None):
+        self.start = self.last = time.perf_counter() if start is None else start
+        self.phases = []
+
+    def mark(self, phase):
+        now = time.perf_counter()
+        self.phases.append((phase, now - self.last))
+        self.last = now
+
+    def report(self):
+        lines = [f"{phase:<16}{seconds * 1000:8.1f} ms" for phase, seconds in self.phases]
+        lines.append(f"{'total':<16}{(self.last - self.start) * 1000:8.1f} ms")
+        return "\n".join(lines)
@@ -0,0 +1,153 @@
+import pygame as pg
+
+# Immediate-mode renderer with dirty-rect tracking. Everything drawn in a
+# frame is queued with blit(); present() compares the queue with the previous
+# frame and recomposes only the regions where something appeared, moved,
+# changed or disappeared: backdrop first, then every queued item clipped to
+# the region. Only those regions are passed to pg.display.update(). When
+# much changes, tracking regions costs more than it saves, so past
+# MAX_CHANGED rects or FULL_AREA of the screen it repaints it whole. The area
+# limit is low because clipped copies of tall regions (pipe columns) cost
+# almost as much per row as full-width ones.
+
+MAX_CHANGED = 48
+FULL_AREA = 0.25
+
+
+def merge_rects(rects, bounds):
+    # Overlapping rects are merged when their union is no bigger than the
+    # two apart, so a moved sprite's old and new place become one region
+    # without swallowing the space between unrelated ones. Regions that
+    # still overlap are just repainted twice.
+    merged = []
+    for rect in rects:
+        rect = rect.clip(bounds)
+        if not rect.width or not rect.height:
+            continue
+        while True:
+            for i in rect.collidelistall(merged):
+                other = merged[i]
+                union = rect.union(other)
+                if union.w * union.h <= rect.w * rect.h + other.w * other.h:
+                    del merged[i]
+                    rect = union
+                    break
+            else:
+                break
+        merged.append(rect)
+    return merged
+
+
+def expand(items):
+    # Queued items as Surface.blits() arguments, batches spliced in place
+    expanded = []
+    for item in items:
+        if item[0] is None:
+            expanded.extend(item[2])
+        else:
+            expanded.append(item)
+    return expanded
+
+
+def shade(surface, alpha):
+    # Copy of surface with a black overlay of the given alpha composited in
+    shaded = surface.copy()
+    overlay = pg.Surface(surface.get_size(), pg.SRCALPHA)
+    overlay.fill((0, 0, 0, alpha))
+    shaded.blit(overlay, (0, 0))
+    return shaded
+
+
+class Renderer:
+    def __init__(self, screen, dirty_rects=True):
+        self.screen = screen
+        self.bounds = screen.get_rect()
+        self.dirty_rects = dirty_rects
+        self.backdrop = None
+        self.items = []
+        self.previous = {}
+        self.overlays = {}
+        self.full_redraw = True
+        self.last_dirty = []
+
+    def set_backdrop(self, surface):
+        if surface is not self.backdrop:
+            self.backdrop = surface
+            self.full_redraw = True
+
+    def overlay(self, alpha):
+        # Shared full-screen black overlay, one surface per alpha
+        if alpha not in self.overlays:
+            surface = pg.Surface(self.bounds.size, pg.SRCALPHA)
+            surface.fill((0, 0, 0, alpha))
+            self.overlays[alpha] = surface
+        return self.overlays[alpha]
+
+    def blit(self, surface, dest, area=None):
+        size = surface.get_size() if area is None else area[2:]
+        rect = pg.Rect(dest[0], dest[1], *size)
+        self.items.append((surface, rect, area))
+        return rect
+
+    def blits(self, items, bounds=None):
+        if bounds is None:
+            for item in items:
+                self.blit(*item)
+            return
+        # A batch with known bounds (particles) changes every frame, and diffing
+        # it item by item costs more than repainting its bounds, so it is queued
+        # as one entry that never matches the previous frame
+        if items:
+            self.items.append((None, pg.Rect(bounds), items))
+
+    def draw_group(self, group):
+        for sprite in group.sprites():
+            self.blit(sprite.image, sprite.rect)
+
+    def present(self):
+        dirty = self.compose()
+        self.flip(dirty)
+        return dirty
+
+    def compose(self):
+        # Repaint the changed regions of the screen surface
+        items = self.items
+        full = self.full_redraw or not self.dirty_rects
+        current = {}
+        if self.dirty_rects:
+            current = {(surface, rect.x, rect.y, surface.get_alpha(), area and tuple(area))
+                       if surface is not None else object(): rect
+                       for surface, rect, area in items}
+        if not full:
+            added = current.keys() - self.previous.keys()
+            removed = self.previous.keys() - current.keys()
+            if len(added) + len(removed) > MAX_CHANGED:
+                full = True
+            else:
+                changed = [current[key] for key in added] + [self.previous[key] for key in removed]
+                dirty = merge_rects(changed, self.bounds)
+                full = sum(rect.w * rect.h for rect in dirty) > FULL_AREA * self.bounds.w * self.bounds.h
+        if full:
+            dirty = [self.bounds.copy()]
+
+        screen = self.screen
+        if full:
+            screen.blit(self.backdrop, (0, 0))
+            screen.blits(expand(items), doreturn=False)
+        else:
+            rects = [item[1] for item in items]
+            for region in dirty:
+                screen.set_clip(region)
+                screen.blit(self.backdrop, region, region)
+                screen.blits(expand([items[i] for i in region.collidelistall(rects)]), doreturn=False)
+            screen.set_clip(None)
+
+        self.previous = current
+        self.items = []
+        self.full_redraw = False
+        self.last_dirty = dirty
+        return dirty
+
+    def flip(self, dirty):
+        if dirty:
+            pg.display.update(dirty)
@@ -0,0 +1,169 @@
+import argparse, pathlib, struct, sys, time
+import engine
+
+# Replays hold everything needed to re-run a game deterministically: the RNG
+# seed, the engine parameters and the tick of every flap. Layout (little
+# endian):
+#   header  "FBRP", version u8, seed u32, ticks u32, score u32,
+#           scroll_spd u16, gap u16, frequency u16, pipe height min/max i16
+#   course  name length varint, then the UTF-8 curve name, empty for
+#           random pipes (version 3 only)
+#   flaps   count varint, then tick deltas as varints
+
+MAGIC = b"FBRP"
+# Version 2: sub-pixel bird movement, version 1 replays no longer reproduce
+# Version 3: seeded courses, version 2 replays still load as random pipes
+VERSION = 3
+HEADER = struct.Struct("<4sBIIIHHHhh")
+
+
+def write_varint(out, value):
+    while value >= 0x80:
+        out.append((value & 0x7F) | 0x80)
+        value >>= 7
+    out.append(value)
+
+
+def read_varint(data, pos):
+    value = shift = 0
+    while True:
+        byte = data[pos]
+        pos += 1
+        value |= (byte & 0x7F) << shift
+        if byte < 0x80:
+            return value, pos
+        shift += 7
+
+
+class ReplayError(ValueError):
+    pass
+
+
+class Replay:
+    def __init__(self, seed, params=None, flaps=None, ticks=0, score=0):
+        self.seed = seed
+        self.params = dict(params or {"scroll_spd": engine.SCROLL_SPD, "gap": engine.GAP,
+                                      "frequency": engine.FREQUENCY,
+                                      "pipe_height_range": engine.PIPE_HEIGHT_RANGE, "course": None})
+        self.flaps = list(flaps or [])
+        self.ticks = ticks
+        self.score = score
+
+    @classmethod
+    def record(cls, game):
+        # Start a replay for a game that has just been reset
+        return cls(game.seed, game.params)
+
+    def finish(self, game):
+        self.ticks = game.tick
+        self.score = game.score
+
+    def to_bytes(self):
+        low, high = self.params["pipe_height_range"]
+        out = bytearray(HEADER.pack(MAGIC, VERSION, self.seed, self.ticks, self.score,
+                                    self.params["scroll_spd"], self.params["gap"],
+                                    self.params["frequency"], low, high))
+        course = (self.params.get("course") or "").encode()
+        write_varint(out, len(course))
+        out += course
+        write_varint(out, len(self.flaps))
+        last = 0
+        for tick in self.flaps:
+            write_varint(out, tick - last)
+            last = tick
+        return bytes(out)
+
+    @classmethod
+    def from_bytes(cls, data):
+        if len(data) < HEADER.size:
+            raise ReplayError("replay is truncated")
+        magic, version, seed, ticks, score, scroll_spd, gap, frequency, low, high = HEADER.unpack_from(data)
+        if magic != MAGIC:
+            raise ReplayError("not a replay file")
+        if version not in (2, VERSION):
+            raise ReplayError(f"unsupported replay version {version}")
+        params = {"scroll_spd": scroll_spd, "gap": gap, "frequency": frequency, "pipe_height_range": (low, high),
+                  "course": None}
+        try:
+            pos = HEADER.size
+            if version == VERSION:
+                length, pos = read_varint(data, pos)
+                if pos + length > len(data):
+                    raise IndexError
+                params["course"] = data[pos:pos + length].decode() or None
+                pos += length
+            count, pos = read_varint(data, pos)
+            flaps = []
+            tick = 0
+            for _ in range(count):
+                delta, pos = read_varint(data, pos)
+                tick += delta
+                flaps.append(tick)
+        except IndexError:
+            raise ReplayError("replay is truncated") from None
+        return cls(seed, params, flaps, ticks, score)
+
+    @classmethod
+    def load(cls, path):
+        return cls.from_bytes(pathlib.Path(path).read_bytes())
+
+    def player(self):
+        return ReplayPlayer(self)
+
+
+class ReplayPlayer:
+    # Feeds recorded flaps back in: flap(tick) is True on recorded ticks
+    def __init__(self, replay):
+        self.replay = replay
+        self.flaps = iter(replay.flaps)
+        self.next_flap = next(self.flaps, None)
+
+    def flap(self, tick):
+        if self.next_flap == tick:
+            self.next_flap = next(self.flaps, None)
+            return True
+        return False
+
+
+def simulate(replay, collider=None):
+    game = engine.Game(replay.seed, collider=collider, **replay.params)
+    player = replay.player()
+    while game.alive and game.tick < replay.ticks:
+        game.step(player.flap(game.tick + 1))
+    return game
+
+
+def validate(replay, collider=None):
+    game = simulate(replay, collider)
+    return not game.alive and game.tick == replay.ticks and game.score == replay.score
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Check that replays reproduce their recorded score.")
+    parser.add_argument("replays", nargs="+", type=pathlib.Path)
+    parser.add_argument("--boxes", action="store_true", help="use box collisions instead of the game's pixel masks")
+    args = parser.parse_args(argv)
+
+    collider = None
+    if not args.boxes:
+        from assets import Assets, build_mask_collider, open_bundle
+        collider = build_mask_collider(Assets(open_bundle()))
+
+    failed = 0
+    for path in args.replays:
+        start = time.perf_counter()
+        try:
+            replay = Replay.load(path)
+            ok = validate(replay, collider)
+        except (OSError, ReplayError) as e:
+            print(f"{path}: ERROR {e}")
+            failed += 1
+            continue
+        elapsed = (time.perf_counter() - start) * 1000
+        print(f"{path}: {'OK' if ok else 'MISMATCH'} score={replay.score} ticks={replay.ticks} ({elapsed:.1f} ms)")
+        failed += not ok
+    return 1 if failed else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,168 @@
+import json, os, pathlib, sys, threading, time
+
+# Versioned save file written behind the game loop. Changes update the in
+# memory data and wake a writer thread, which coalesces whatever has piled
+# up into a single write of the latest state. Every write goes to a temp file
+# that is fsync'd and renamed over the save, so a crash mid-write leaves the
+# previous save intact.
+
+SAVE_VERSION = 1
+
+
+def write_atomic(path, data):
+    path = pathlib.Path(path)
+    tmp = path.with_name(path.name + ".tmp")
+    with open(tmp, "wb" if isinstance(data, bytes) else "w") as f:
+        f.write(data)
+        f.flush()
+        os.fsync(f.fileno())
+    os.replace(tmp, path)
+
+
+def empty_save():
+    return {"version": SAVE_VERSION, "high_score": 0, "achievements": {}, "runs": []}
+
+
+def load_legacy(highscore_path, achievements_path):
+    # Import the highscore.txt / achievements.json files used before save.json
+    data = empty_save()
+    try:
+        data["high_score"] = int(pathlib.Path(highscore_path).read_text())
+    except (FileNotFoundError, ValueError, TypeError):
+        pass
+    try:
+        with open(achievements_path, 'r') as f:
+            data["achievements"] = {ach["name"]: ach["unlocked"] for ach in json.load(f)}
+    except (FileNotFoundError, json.JSONDecodeError, TypeError, KeyError):
+        pass
+    return data
+
+
+def migrate(data):
+    # Bring older save layouts up to SAVE_VERSION. Valid JSON that is not a
+    # save at all raises ValueError, like JSON that does not parse
+    if not isinstance(data, dict):
+        raise ValueError("save is not a JSON object")
+    merged = empty_save()
+    merged.update(data)
+    for field, kind in (("high_score", int), ("achievements", dict), ("runs", list)):
+        if not isinstance(merged[field], kind):
+            raise ValueError(f"save field {field!r} has the wrong type")
+    merged["version"] = SAVE_VERSION
+    return merged
+
+
+class SaveStore:
+    def __init__(self, path, legacy_highscore=None, legacy_achievements=None):
+        self.path = pathlib.Path(path)
+        self.lock = threading.Lock()
+        self.data = self._load(legacy_highscore, legacy_achievements)
+        self._dirty = False
+        self._files = {}
+        self._closed = False
+        self._pending = threading.Event()
+        self._idle = threading.Event()
+        self._idle.set()
+        self._writer = threading.Thread(target=self._write_loop, name="save-writer", daemon=True)
+        self._writer.start()
+
+    def _load(self, legacy_highscore, legacy_achievements):
+        try:
+            with open(self.path, 'r') as f:
+                return migrate(json.load(f))
+        except FileNotFoundError:
+            return load_legacy(legacy_highscore, legacy_achievements)
+        except ValueError as e:
+            # Keep the unreadable file around instead of silently dropping it
+            corrupt = self.path.with_name(f"{self.path.name}.corrupt-{int(time.time())}")
+            print(f"warning: {self.path} is corrupt ({e}), moving it to {corrupt.name}", file=sys.stderr)
+            try:
+                os.replace(self.path, corrupt)
+            except OSError as e:
+                print(f"warning: could not move {self.path} aside: {e}", file=sys.stderr)
+            return load_legacy(legacy_highscore, legacy_achievements)
+        except OSError as e:
+            print(f"warning: could not read {self.path}: {e}", file=sys.stderr)
+            return load_legacy(legacy_highscore, legacy_achievements)
+
+    @property
+    def high_score(self):
+        return self.data["high_score"]
+
+    @high_score.setter
+    def high_score(self, value):
+        with self.lock:
+            self.data["high_score"] = value
+        self.save()
+
+    @property
+    def achievements(self):
+        return self.data["achievements"]
+
+    @property
+    def runs(self):
+        return self.data["runs"]
+
+    def unlock(self, name):
+        with self.lock:
+            self.data["achievements"][name] = True
+        self.save()
+
+    def record_run(self, **run):
+        run.setdefault("time", round(time.time()))
+        with self.lock:
+            self.data["runs"].append(run)
+        self.save()
+
+    def write_file(self, path, data):
+        # Write any other file (e.g. a replay) from the writer thread
+        with self.lock:
+            self._files[pathlib.Path(path)] = data
+            self._idle.clear()
+        self._pending.set()
+
+    def save(self):
+        with self.lock:
+            self._dirty = True
+            self._idle.clear()
+        self._pending.set()
+
+    def flush(self, timeout=None):
+        return self._idle.wait(timeout)
+
+    def close(self, timeout=5):
+        self.flush(timeout)
+        self._closed = True
+        self._pending.set()
+        self._writer.join(timeout)
+
+    def _write_loop(self):
+        while True:
+            self._pending.wait()
+            self._pending.clear()
+            with self.lock:
+                files, self._files = self._files, {}
+                if not self._dirty and not files:
+                    if self._closed:
+                        return
+                    continue
+                data = None
+                if self._dirty:
+                    # Copied under the lock and serialized outside it, so the
+                    # game thread never waits on dumping the whole run history
+                    data = dict(self.data, achievements=dict(self.data["achievements"]), runs=list(self.data["runs"]))
+                    self._dirty = False
+            try:
+                if data is not None:
+                    files[self.path] = json.dumps(data, indent=4)
+                for path, contents in files.items():
+                    try:
+                        path.parent.mkdir(parents=True, exist_ok=True)
+                        write_atomic(path, contents)
+                    except OSError as e:
+                        # Given up on; the next change writes the save again
+                        print(f"warning: could not write {path}: {e}", file=sys.stderr)
+            finally:
+                with self.lock:
+                    if not self._dirty and not self._files:
+                        self._idle.set()
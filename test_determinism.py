@@ -0,0 +1,110 @@
+import random
+import numpy as np
+import pytest
+import engine
+from autopilot import fallback
+from batch_env import BatchEnv, CAUSES
+from replay import HEADER, Replay, ReplayError, simulate, validate
+
+# Determinism contracts the replay format, score validation and the batch
+# environment rely on. Everything runs headless with box collisions.
+
+
+def aim_then_drop(ticks):
+    # Passes a few pipes, then stops flapping, so every run ends on its own
+    return lambda game: game.tick < ticks and fallback(game)
+
+
+def record(policy, seed, course=None, max_ticks=10_000):
+    # Play a run the way main.py records it: a flap lands on the tick it is stepped in
+    game = engine.Game(seed, course=course)
+    replay = Replay.record(game)
+    while game.alive and game.tick < max_ticks:
+        flap = policy(game)
+        game.step(flap)
+        if flap:
+            replay.flaps.append(game.tick)
+    replay.finish(game)
+    return game, replay
+
+
+def as_v2(data):
+    # The same replay in the version 2 layout, which had no course field
+    assert data[HEADER.size] == 0, "only replays without a course have a v2 form"
+    return data[:4] + bytes([2]) + data[5:HEADER.size] + data[HEADER.size + 1:]
+
+
+@pytest.mark.parametrize("course", [None, "ramp"])
+def test_replay_bytes_round_trip(course):
+    game, replay = record(aim_then_drop(900), seed=11, course=course)
+    data = replay.to_bytes()
+    loaded = Replay.from_bytes(data)
+    assert (loaded.seed, loaded.params, loaded.flaps, loaded.ticks, loaded.score) == \
+        (replay.seed, replay.params, replay.flaps, replay.ticks, replay.score)
+    assert loaded.to_bytes() == data
+
+
+def test_replay_v2_loads_as_random_pipes():
+    game, replay = record(aim_then_drop(900), seed=5)
+    loaded = Replay.from_bytes(as_v2(replay.to_bytes()))
+    assert loaded.params["course"] is None
+    assert loaded.flaps == replay.flaps
+    assert validate(loaded)
+    # Saved again it is a version 3 replay
+    assert loaded.to_bytes() == replay.to_bytes()
+
+
+@pytest.mark.parametrize("data", [b"", b"FBRP", b"XXXX" + bytes(HEADER.size)])
+def test_replay_rejects_garbage(data):
+    with pytest.raises(ReplayError):
+        Replay.from_bytes(data)
+
+
+def test_replay_rejects_truncated_flaps():
+    game, replay = record(aim_then_drop(900), seed=3)
+    with pytest.raises(ReplayError):
+        Replay.from_bytes(replay.to_bytes()[:-1])
+
+
+@pytest.mark.parametrize("course", [None, "ramp", "daily"])
+def test_validate_recorded_run(course):
+    game, replay = record(aim_then_drop(1200), seed=42, course=course)
+    assert not game.alive and game.score > 0
+    assert validate(Replay.from_bytes(replay.to_bytes()))
+    replayed = simulate(replay)
+    assert (replayed.tick, replayed.score, replayed.death_cause) == (game.tick, game.score, game.death_cause)
+
+
+def test_validate_rejects_tampered_runs():
+    game, replay = record(aim_then_drop(1200), seed=42)
+    for field, value in (("score", replay.score + 1), ("ticks", replay.ticks + 1)):
+        tampered = Replay.from_bytes(replay.to_bytes())
+        setattr(tampered, field, value)
+        assert not validate(tampered), field
+    # A run cut short is still alive where it claims to have ended
+    cut = Replay(replay.seed, replay.params, replay.flaps, replay.ticks - 1, replay.score)
+    assert not validate(cut)
+
+
+@pytest.mark.parametrize("seed", [0, 7])
+def test_batch_env_matches_game(seed):
+    # Random flappers die early in every way; aiming birds pass pipes first
+    policies = [aim_then_drop(300 * i) for i in range(1, 5)]
+    for i in range(4):
+        rng = random.Random(f"bird-{seed}-{i}")
+        policies.append(lambda game, rng=rng: rng.random() < 0.08)
+    games = [engine.Game(seed) for _ in policies]
+    env = BatchEnv(len(policies), seed)
+    while not env.done:
+        actions = [policy(game) and game.alive for policy, game in zip(policies, games)]
+        for game, flap in zip(games, actions):
+            game.step(flap)
+        env.step(actions)
+        assert np.array_equal(env.ticks, [game.tick for game in games])
+        assert np.array_equal(env.y, [game.bird.y for game in games])
+        assert np.array_equal(env.vel, [game.bird.vel for game in games])
+        assert np.array_equal(env.alive, [game.alive for game in games])
+        assert np.array_equal(env.score, [game.score for game in games])
+    for i, game in enumerate(games):
+        assert env.flaps[i] == game.flap_count
+        assert CAUSES[env.cause[i]] == game.death_cause
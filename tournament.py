@@ -0,0 +1,272 @@
+import argparse, importlib, itertools, json, multiprocessing, os, random, struct, sys, time
+import numpy as np
+import engine
+from course import CURVES
+
+# Headless tournaments: every policy plays every point of a parameter grid
+# for the same seeded episodes, spread over a process pool. Results stream
+# into a columnar file as chunks finish:
+#   header  "FBTR", version u8, metadata length u32, metadata JSON
+#   chunks  row count u32, then each column of COLUMNS as raw little
+#           endian array data
+# The metadata names the policies, the grid points (engine parameters)
+# and the death causes and achievement bits the integer columns refer to.
+
+MAGIC = b"FBTR"
+VERSION = 1
+HEADER = struct.Struct("<4sBI")
+CHUNK = struct.Struct("<I")
+COLUMNS = [
+    ("config", "<u2"), ("policy", "<u1"), ("seed", "<u4"), ("score", "<u4"),
+    ("ticks", "<u4"), ("flaps", "<u4"), ("cause", "<u1"), ("achievements", "<u1"),
+]
+CAUSES = [None, "ceiling", "pipe", "ground"]
+ACHIEVEMENT_IDS = ["icarus", "grounded", "close_shave", "zen_flapper", "nyepi"]
+PARAMS = ("scroll_spd", "gap", "frequency", "pipe_height_range", "course")
+
+
+class TournamentError(ValueError):
+    pass
+
+
+def random_policy(seed, p=0.08):
+    # Its own stream: Random(seed) would repeat the draws of the pipe heights
+    rng = random.Random(f"policy-{seed}")
+    return lambda game: rng.random() < p
+
+
+def autopilot_policy(seed):
+    # Unlimited search time so results don't depend on machine load
+    from autopilot import Autopilot
+    return Autopilot(budget_ms=float("inf"), threaded=False).flap
+
+
+def aim_policy(seed):
+    from autopilot import fallback
+    return fallback
+
+
+# name -> factory(seed) returning a policy(game) for one episode. Anything
+# else is taken as "module:attr" naming such a factory.
+POLICIES = {
+    "idle": lambda seed: lambda game: False,
+    "random": random_policy,
+    "aim": aim_policy,
+    "autopilot": autopilot_policy,
+}
+
+
+def load_policy(name):
+    if name in POLICIES:
+        return POLICIES[name]
+    module, _, attr = name.partition(":")
+    if not attr:
+        raise TournamentError(f"unknown policy {name!r}, expected one of {sorted(POLICIES)} or module:factory")
+    return getattr(importlib.import_module(module), attr)
+
+
+def parse_grid(specs):
+    # ["gap=150,200", "pipe_height_range=-300:100,-200:50"] -> list of params.
+    # A course axis names difficulty curves, "random" for random pipes.
+    axes = {}
+    for spec in specs:
+        key, _, values = spec.partition("=")
+        if key not in PARAMS or not values:
+            raise TournamentError(f"bad grid axis {spec!r}, expected one of {PARAMS} as name=v1,v2")
+        if key == "pipe_height_range":
+            axes[key] = [tuple(int(v) for v in value.split(":")) for value in values.split(",")]
+        elif key == "course":
+            axes[key] = [None if value == "random" else value for value in values.split(",")]
+            unknown = set(axes[key]) - set(CURVES) - {None}
+            if unknown:
+                raise TournamentError(f"unknown course curve {sorted(unknown)}, expected one of {sorted(CURVES)}")
+        else:
+            axes[key] = [int(value) for value in values.split(",")]
+    return [dict(zip(axes, combo)) for combo in itertools.product(*axes.values())]
+
+
+_collider = None
+
+
+def init_worker(masks):
+    global _collider
+    if masks:
+        os.environ.setdefault("SDL_VIDEODRIVER", "dummy")
+        from assets import Assets, build_mask_collider, open_bundle
+        _collider = build_mask_collider(Assets(open_bundle()))
+
+
+def run_chunk(task):
+    # One (grid point, policy) pair over a run of consecutive seeds
+    config_index, params, policy_index, policy_name, first_seed, count, max_ticks = task
+    factory = load_policy(policy_name)
+    rows = np.zeros(count, dtype=[(name, dtype) for name, dtype in COLUMNS])
+    rows["config"] = config_index
+    rows["policy"] = policy_index
+    for i in range(count):
+        seed = first_seed + i
+        game = engine.run_episode(factory(seed), seed, max_ticks, collider=_collider, **params)
+        rows["seed"][i] = seed
+        rows["score"][i] = game.score
+        rows["ticks"][i] = game.tick
+        rows["flaps"][i] = game.flap_count
+        rows["cause"][i] = CAUSES.index(game.death_cause)
+        rows["achievements"][i] = sum(1 << bit for bit, name in enumerate(ACHIEVEMENT_IDS) if name in game.triggered)
+    return rows
+
+
+class ResultWriter:
+    def __init__(self, path, meta):
+        self.file = open(path, "wb")
+        data = json.dumps(meta).encode()
+        self.file.write(HEADER.pack(MAGIC, VERSION, len(data)))
+        self.file.write(data)
+
+    def write(self, rows):
+        self.file.write(CHUNK.pack(len(rows)))
+        for name, _ in COLUMNS:
+            self.file.write(np.ascontiguousarray(rows[name]).tobytes())
+
+    def close(self):
+        self.file.close()
+
+
+def read_results(path):
+    with open(path, "rb") as f:
+        data = f.read()
+    if len(data) < HEADER.size:
+        raise TournamentError("results file is truncated")
+    magic, version, meta_len = HEADER.unpack_from(data)
+    if magic != MAGIC:
+        raise TournamentError("not a tournament results file")
+    if version != VERSION:
+        raise TournamentError(f"unsupported results version {version}")
+    pos = HEADER.size + meta_len
+    meta = json.loads(data[HEADER.size:pos])
+    chunks = {name: [] for name, _ in COLUMNS}
+    # A run that was interrupted leaves a partial last chunk, which is skipped
+    while pos + CHUNK.size <= len(data):
+        (n,) = CHUNK.unpack_from(data, pos)
+        end = pos + CHUNK.size + n * sum(np.dtype(dtype).itemsize for _, dtype in COLUMNS)
+        if end > len(data):
+            break
+        pos += CHUNK.size
+        for name, dtype in COLUMNS:
+            size = n * np.dtype(dtype).itemsize
+            chunks[name].append(np.frombuffer(data, dtype, n, pos))
+            pos += size
+    columns = {name: np.concatenate(parts) if parts else np.zeros(0, dtype)
+               for (name, dtype), parts in zip(COLUMNS, chunks.values())}
+    return meta, columns
+
+
+def summarize(meta, columns):
+    groups = []
+    for config_index, params in enumerate(meta["configs"]):
+        for policy_index, policy in enumerate(meta["policies"]):
+            mask = (columns["config"] == config_index) & (columns["policy"] == policy_index)
+            n = int(mask.sum())
+            if not n:
+                continue
+            score = columns["score"][mask]
+            cause = columns["cause"][mask]
+            achievements = columns["achievements"][mask]
+            groups.append({
+                "params": params,
+                "policy": policy,
+                "episodes": n,
+                "score_mean": float(score.mean()),
+                "score_p50": float(np.percentile(score, 50)),
+                "score_p90": float(np.percentile(score, 90)),
+                "score_p99": float(np.percentile(score, 99)),
+                "score_max": int(score.max()),
+                "ticks_mean": float(columns["ticks"][mask].mean()),
+                "flaps_mean": float(columns["flaps"][mask].mean()),
+                "causes": {name or "survived": float(np.mean(cause == i)) for i, name in enumerate(meta["causes"])},
+                "achievements": {name: float(np.mean(achievements & (1 << bit) != 0))
+                                 for bit, name in enumerate(meta["achievement_ids"])},
+            })
+    return groups
+
+
+def print_summary(groups, out=sys.stdout):
+    for group in groups:
+        params = " ".join(f"{k}={v}" for k, v in group["params"].items()) or "defaults"
+        causes = " ".join(f"{k} {v:.0%}" for k, v in group["causes"].items() if v)
+        print(f"{group['policy']:<12}{params:<48}n={group['episodes']:<8}"
+              f"score mean {group['score_mean']:.2f} p50 {group['score_p50']:.0f} p90 {group['score_p90']:.0f} "
+              f"p99 {group['score_p99']:.0f} max {group['score_max']}  ticks {group['ticks_mean']:.0f}  {causes}",
+              file=out)
+
+
+def run(args):
+    configs = parse_grid(args.grid)
+    for name in args.policy:
+        load_policy(name)
+    meta = {"policies": args.policy, "configs": configs, "causes": CAUSES,
+            "achievement_ids": ACHIEVEMENT_IDS, "max_ticks": args.max_ticks, "first_seed": args.seed,
+            "masks": args.masks}
+    tasks = []
+    for config_index, params in enumerate(configs):
+        for policy_index, policy in enumerate(args.policy):
+            for start in range(0, args.episodes, args.chunk):
+                tasks.append((config_index, params, policy_index, policy, args.seed + start,
+                              min(args.chunk, args.episodes - start), args.max_ticks))
+
+    writer = ResultWriter(args.out, meta)
+    done = 0
+    total = len(configs) * len(args.policy) * args.episodes
+    start = time.perf_counter()
+    try:
+        with multiprocessing.Pool(args.workers, initializer=init_worker, initargs=(args.masks,)) as pool:
+            for rows in pool.imap_unordered(run_chunk, tasks):
+                writer.write(rows)
+                done += len(rows)
+                if not args.quiet:
+                    elapsed = time.perf_counter() - start
+                    print(f"\r{done}/{total} episodes, {done / elapsed:.0f}/s", end="", file=sys.stderr)
+    finally:
+        writer.close()
+    if not args.quiet:
+        print(file=sys.stderr)
+    print_summary(summarize(*read_results(args.out)))
+    return 0
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Run seeded headless tournaments of policies over parameter grids.")
+    sub = parser.add_subparsers(dest="command", required=True)
+    run_parser = sub.add_parser("run", help="play the episodes and write a results file")
+    run_parser.add_argument("--policy", action="append", required=True,
+                            help=f"one of {sorted(POLICIES)} or module:factory (repeatable)")
+    run_parser.add_argument("--grid", action="append", default=[],
+                            help="parameter axis, e.g. gap=150,200, pipe_height_range=-300:100 or course=random,ramp (repeatable)")
+    run_parser.add_argument("--episodes", type=int, default=1000, help="seeded episodes per policy and grid point")
+    run_parser.add_argument("--seed", type=int, default=0, help="seed of the first episode")
+    run_parser.add_argument("--max-ticks", type=int, default=20_000)
+    run_parser.add_argument("--workers", type=int, default=None, help="processes, all cores by default")
+    run_parser.add_argument("--chunk", type=int, default=500, help="episodes per task")
+    run_parser.add_argument("--masks", action="store_true", help="use the game's pixel masks instead of boxes")
+    run_parser.add_argument("--out", default="tournament.fbt")
+    run_parser.add_argument("--quiet", action="store_true")
+    summary_parser = sub.add_parser("summary", help="aggregate an existing results file")
+    summary_parser.add_argument("results")
+    summary_parser.add_argument("--json", action="store_true", help="print the aggregates as JSON")
+    args = parser.parse_args(argv)
+
+    try:
+        if args.command == "run":
+            return run(args)
+        groups = summarize(*read_results(args.results))
+    except (OSError, TournamentError) as e:
+        print(f"error: {e}", file=sys.stderr)
+        return 1
+    if args.json:
+        print(json.dumps(groups, indent=4))
+    else:
+        print_summary(groups)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())